@@ -0,0 +1,196 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from backend import (COLS, ZOBRIST_EARLY, ZOBRIST_MAXIMIZING, MoveOrdering, SearchStats, SearchTimeout,
+                     TranspositionTable, cancellable, iterative_deepening, minimax)
+from mcts import MCTS
+from opening_book import book_move
+from parallel_search import ParallelSearch
+
+# Searches run in one background process so the pygame loop never blocks.
+# The process keeps a transposition table and move ordering tables per AI
+# for the whole game. Every
+# job carries the generation it was submitted under; bumping the shared
+# generation counter makes older jobs give up at their next check.
+
+_tables = {}
+_orderings = {}
+_engines = {}
+_generation = None
+_predicted = None
+
+def _init_worker(generation, predicted):
+    global _generation, _predicted
+    _generation = generation
+    _predicted = predicted
+
+def _search_job(ai_id, generation, board, time_limit, maximizing, player, opponent, no_moves,
+                heuristic_func, max_depth, with_stats=False):
+    # returns (value, move, depth, stats dict or None)
+    booked = book_move(board, maximizing, player, opponent, heuristic_func, max_depth)
+    if booked is not None:
+        return booked + ({"engine": "book", "depth": booked[2]} if with_stats else None,)
+    tt = _tables.setdefault(ai_id, TranspositionTable())
+    ordering = _orderings.setdefault(ai_id, MoveOrdering())
+    stats = SearchStats(timing=True) if with_stats else None
+    heuristic = cancellable(heuristic_func, _generation, generation)
+    try:
+        result = iterative_deepening(board, time_limit, maximizing, player, opponent, no_moves, heuristic,
+                                     max_depth, tt, stats, ordering)
+    except SearchTimeout:
+        return None
+    return result + (stats.as_dict() if stats is not None else None,)
+
+def _ponder_job(ai_id, generation, board, time_limit, maximizing, player, opponent, no_moves,
+                heuristic_func, max_depth, with_stats=False):
+    # Guess the reply from the AI's own table (the position was a child of
+    # its last search), falling back to a shallow search, then search the
+    # position after that reply as if it had been played.
+    reply_player = opponent if maximizing else player
+    tt = _tables.setdefault(ai_id, TranspositionTable())
+    key = board.key ^ (0 if maximizing else ZOBRIST_MAXIMIZING) ^ (ZOBRIST_EARLY if no_moves - 1 <= 1 else 0)
+    entry = tt.probe(key)
+    move = entry[4] if entry is not None else None
+    if move is None or not board.is_valid_move(*move, reply_player):
+        move = minimax(board, 2, float('-inf'), float('inf'), not maximizing, player, opponent,
+                       no_moves - 1, heuristic_func)[1]
+    if move is None or _generation.value != generation:
+        return None
+    _predicted.value = move[0] * COLS + move[1]
+    predicted_board = board.clone()
+    predicted_board.apply_move(*move, reply_player)
+    return _search_job(ai_id, generation, predicted_board, time_limit, maximizing, player, opponent,
+                       no_moves, heuristic_func, max_depth, with_stats)
+
+
+def _mcts_job(ai_id, generation, board, time_limit, maximizing, player, opponent, no_moves,
+              heuristic_func, max_depth, with_stats=False):
+    # returns (win rate, move, playouts, stats dict or None); the engine and
+    # its tree are kept per AI so the tree carries over to the next move
+    engine = _engines.get(ai_id)
+    if engine is None or engine.heuristic_func is not heuristic_func:
+        engine = _engines[ai_id] = MCTS(None, time_limit, "heuristic", heuristic_func)
+    engine.time_limit = time_limit
+    start = time.perf_counter()
+    move, win_rate, playouts = engine.search(board, player if maximizing else opponent,
+                                             lambda: _generation.value != generation)
+    if _generation.value != generation:
+        return None
+    stats = None
+    if with_stats:
+        seconds = time.perf_counter() - start
+        stats = {"engine": "mcts", "playouts": playouts, "reused": engine.reused, "win_rate": win_rate,
+                 "search_time": seconds, "playouts_per_sec": round(playouts / seconds) if seconds else 0}
+    return win_rate, move, playouts, stats
+
+
+class SearchClient:
+    # With stats=True every search is instrumented and last_stats holds the
+    # SearchStats.as_dict() of the most recent result. With workers > 1 each
+    # search is a ParallelSearch on that many processes, driven from a
+    # thread. engine="mcts" searches with MCTS instead of minimax, with
+    # heuristic playouts; the result is then (win rate, move, playouts).
+    # Pondering is only available for the serial minimax search.
+    def __init__(self, stats=False, workers=1, engine="minimax"):
+        if engine not in ("minimax", "mcts"):
+            raise ValueError(f"unknown search engine {engine!r}")
+        self._generation = multiprocessing.RawValue('i', 0)
+        self._predicted = multiprocessing.RawValue('i', -1)
+        self.engine = engine
+        if workers > 1 and engine == "minimax":
+            self._parallel = ParallelSearch(workers, self._generation)
+            self._executor = ThreadPoolExecutor(1)
+        else:
+            self._parallel = None
+            self._executor = ProcessPoolExecutor(1, initializer=_init_worker,
+                                                 initargs=(self._generation, self._predicted))
+        self._future = None
+        self._request = None
+        self._ponder = None
+        self.stats = stats
+        self.last_stats = None
+
+    def request(self, ai_id, board, time_limit, maximizing, player, opponent, no_moves,
+                heuristic_func, max_depth):
+        # Call every frame while it is the AI's turn; returns None until the
+        # (value, move, depth) result for this position is ready.
+        request = (ai_id, board.key, maximizing, player, opponent, no_moves, heuristic_func)
+        if self._future is not None and self._request != request:
+            self.cancel()
+        if self._future is None:
+            self._request = request
+            self._future = self._ponder_hit(board, request)
+            if self._future is None:
+                if self.engine == "mcts":
+                    job = _mcts_job
+                else:
+                    job = _search_job if self._parallel is None else self._parallel_job
+                self._future = self._executor.submit(
+                    job, ai_id,
+                    self._generation.value, board, time_limit, maximizing, player, opponent, no_moves,
+                    heuristic_func, max_depth, self.stats)
+        if not self._future.done():
+            return None
+        result = self._future.result()
+        self._future = None
+        self._request = None
+        if result is None:
+            # the ponder search it came from was cancelled; search afresh
+            return self.request(ai_id, board, time_limit, maximizing, player, opponent, no_moves,
+                                heuristic_func, max_depth)
+        *result, self.last_stats = result
+        return tuple(result)
+
+    def ponder(self, ai_id, board, time_limit, maximizing, player, opponent, no_moves,
+               heuristic_func, max_depth):
+        # Start searching the most likely reply to board while the human
+        # thinks. no_moves is the value the AI's next request will use.
+        if self._parallel is not None or self.engine != "minimax":
+            return
+        self.cancel()
+        self._predicted.value = -1
+        future = self._executor.submit(
+            _ponder_job, ai_id, self._generation.value, board, time_limit, maximizing, player,
+            opponent, no_moves, heuristic_func, max_depth, self.stats)
+        self._ponder = (board.clone(), (ai_id, maximizing, player, opponent, no_moves, heuristic_func), future)
+
+    def _parallel_job(self, ai_id, generation, board, time_limit, maximizing, player, opponent, no_moves,
+                      heuristic_func, max_depth, with_stats=False):
+        if self._generation.value != generation:
+            return None
+        booked = book_move(board, maximizing, player, opponent, heuristic_func, max_depth)
+        if booked is not None:
+            return booked + ({"engine": "book", "depth": booked[2]} if with_stats else None,)
+        result = self._parallel.iterative_deepening(board, time_limit, maximizing, player, opponent, no_moves,
+                                                    heuristic_func, max_depth, with_stats)
+        if self._generation.value != generation:
+            return None
+        return result + (self._parallel.stats if with_stats else None,)
+
+    def _ponder_hit(self, board, request):
+        if self._ponder is None:
+            return None
+        base, ponder_request, future = self._ponder
+        self._ponder = None
+        ai_id, board_key, maximizing, player, opponent, no_moves, heuristic_func = request
+        predicted = self._predicted.value
+        if predicted >= 0 and ponder_request == (ai_id, maximizing, player, opponent, no_moves, heuristic_func):
+            reply_player = opponent if maximizing else player
+            base.apply_move(predicted // COLS, predicted % COLS, reply_player)
+            if base.key == board_key:
+                return future
+        self._generation.value += 1
+        return None
+
+    def cancel(self):
+        self._generation.value += 1
+        self._future = None
+        self._request = None
+        self._ponder = None
+
+    def close(self):
+        self.cancel()
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        if self._parallel is not None:
+            self._parallel.close()
@@ -1,141 +1,344 @@
+import functools
 import math
+import random
+import struct
+import time
+
+try:
+    import numpy as np
+except ImportError:     # minimax then evaluates leaves one at a time
+    np = None
 
 ROWS, COLS = 9, 6
+CELLS = ROWS * COLS
+EMPTY = 255
+
+# Per-square tables for the flat layout, square index = row * COLS + col.
+CELL_COORDS = [(r, c) for r in range(ROWS) for c in range(COLS)]
+_BORDERS = [(r == 0 or r == ROWS-1) + (c == 0 or c == COLS-1) for r, c in CELL_COORDS]
+CRITICAL_MASS = [3 - borders for borders in _BORDERS]
+POSITION_WEIGHT = [1 + borders for borders in _BORDERS]
+# count / (CRITICAL_MASS + 1) in twelfths, so the critical mass score stays an integer
+MASS_SCALE = 12
+MASS_UNIT = [MASS_SCALE // (mass + 1) for mass in CRITICAL_MASS]
+NEIGHBOURS = [tuple((r+dr) * COLS + (c+dc) for dr, dc in [(-1,0),(1,0),(0,-1),(0,1)]
+                    if 0 <= r+dr < ROWS and 0 <= c+dc < COLS)
+              for r, c in CELL_COORDS]
+
+# Zobrist keys. A board's key is the XOR of one key per (square, count) and
+# one per (square, owner); empty squares and zero counts contribute nothing.
+# Indices: (square << 4) | (count & 15) and (square << 8) | owner.
+_zobrist_rng = random.Random(0x5EED)
+ZOBRIST_COUNT = [_zobrist_rng.getrandbits(64) if count else 0
+                 for i in range(CELLS) for count in range(16)]
+ZOBRIST_OWNER = [_zobrist_rng.getrandbits(64) if owner < 2 else 0
+                 for i in range(CELLS) for owner in range(256)]
+ZOBRIST_MAXIMIZING = _zobrist_rng.getrandbits(64)
+ZOBRIST_EARLY = _zobrist_rng.getrandbits(64)
+
+# Board.totals holds running aggregates, two entries per quantity
+# (player 0, player 1), starting at these offsets: orbs, squares owned,
+# POSITION_WEIGHT of squares owned, MASS_UNIT-weighted orbs, and squares one
+# orb away from exploding.
+TOTAL_ORBS, TOTAL_CELLS, TOTAL_WEIGHT, TOTAL_MASS, TOTAL_CRITICAL = 0, 2, 4, 6, 8
+
+def _add_square(totals, i, count, owner, sign):
+    if owner == EMPTY:
+        return
+    totals[owner] += sign * count
+    totals[TOTAL_CELLS + owner] += sign
+    totals[TOTAL_WEIGHT + owner] += sign * POSITION_WEIGHT[i]
+    totals[TOTAL_MASS + owner] += sign * count * MASS_UNIT[i]
+    if count == CRITICAL_MASS[i]:
+        totals[TOTAL_CRITICAL + owner] += sign
 
 class Cell:
- def __init__(self, owner=None, count=0):
-        self.owner = owner
-        self.count = count
+    # View of one square of a Board. The board keeps its state in flat
+    # counts/owners arrays; this keeps board.grid[r][c].owner / .count
+    # working for the frontend and other callers.
+    __slots__ = ('board', 'index')
+
+    def __init__(self, board, index):
+        self.board = board
+        self.index = index
+
+    @property
+    def owner(self):
+        owner = self.board.owners[self.index]
+        return None if owner == EMPTY else owner
+
+    @owner.setter
+    def owner(self, owner):
+        board, i = self.board, self.index
+        owner = EMPTY if owner is None else owner
+        board.key ^= ZOBRIST_OWNER[(i << 8) | board.owners[i]] ^ ZOBRIST_OWNER[(i << 8) | owner]
+        _add_square(board.totals, i, board.counts[i], board.owners[i], -1)
+        _add_square(board.totals, i, board.counts[i], owner, 1)
+        board.owners[i] = owner
+
+    @property
+    def count(self):
+        return self.board.counts[self.index]
+
+    @count.setter
+    def count(self, count):
+        board, i = self.board, self.index
+        board.key ^= ZOBRIST_COUNT[(i << 4) | (board.counts[i] & 15)] ^ ZOBRIST_COUNT[(i << 4) | (count & 15)]
+        _add_square(board.totals, i, board.counts[i], board.owners[i], -1)
+        _add_square(board.totals, i, count, board.owners[i], 1)
+        board.counts[i] = count
+        if count > CRITICAL_MASS[i]:
+            board._unstable += (i,)
 
 class Board:
-   def __init__(self):
+    def __init__(self):
         self.rows = ROWS
         self.cols = COLS
-        self.grid = [[Cell() for _ in range(self.cols)] for _ in range(self.rows)]
-
-   def clone(self):
-        new_board = Board()
-        for r in range(self.rows):
-            for c in range(self.cols):
-                cell = self.grid[r][c]
-                new_board.grid[r][c].owner = cell.owner
-                new_board.grid[r][c].count = cell.count
+        self.counts = bytearray(CELLS)
+        self.owners = bytearray([EMPTY]) * CELLS
+        # squares over critical mass left behind when a cascade stopped at
+        # game over (or set directly); they explode with the next move
+        self._unstable = ()
+        self.key = 0
+        self.totals = [0] * 10
+        self._grid = None
+
+    @classmethod
+    def from_arrays(cls, counts, owners):
+        board = cls()
+        board.counts[:] = counts
+        board.owners[:] = owners
+        board.key = board.zobrist_key()
+        board.totals = board.compute_totals()
+        board._unstable = tuple(i for i in range(CELLS) if board.counts[i] > CRITICAL_MASS[i])
+        return board
+
+    @property
+    def grid(self):
+        if self._grid is None:
+            self._grid = [[Cell(self, r * self.cols + c) for c in range(self.cols)] for r in range(self.rows)]
+        return self._grid
+
+    def clone(self):
+        new_board = self.__class__.__new__(self.__class__)
+        new_board.rows = self.rows
+        new_board.cols = self.cols
+        new_board.counts = self.counts[:]
+        new_board.owners = self.owners[:]
+        new_board._unstable = self._unstable
+        new_board.key = self.key
+        new_board.totals = self.totals[:]
+        new_board._grid = None
         return new_board
 
-   def is_valid_move(self, row, col, player):
-        cell = self.grid[row][col]
-        return cell.owner is None or cell.owner == player
-
-   def get_valid_moves(self, player):
-        moves = []
-        for r in range(self.rows):
-            for c in range(self.cols):
-                cell = self.grid[r][c]
-                if cell.owner is None or cell.owner == player:
-                    moves.append((r, c))
-        return moves
-
-   def apply_move(self, row, col, player):
-        cell = self.grid[row][col]
-        cell.count += 1
-        cell.owner = player
-        self._resolve_chain_reactions(row, col)
-
-   def _resolve_chain_reactions(self, row, col):
-        changed = True
-        while changed and not self.is_game_over():
-            changed = False
-            to_explode = []
-            for r in range(self.rows):
-                for c in range(self.cols):
-                    cell = self.grid[r][c]
-                    if cell.count > self._critical_mass(r, c):
-                        to_explode.append((r, c, cell.owner))
-            for r, c, owner in to_explode:
-                self.grid[r][c].count -= self._critical_mass(r, c) + 1
-                if self.grid[r][c].count <= 0:
-                    self.grid[r][c].owner = None
-                    self.grid[r][c].count = 0
-                for dr, dc in [(-1,0),(1,0),(0,-1),(0,1)]:
-                    nr, nc = r+dr, c+dc
-                    if 0 <= nr < self.rows and 0 <= nc < self.cols:
-                        self.grid[nr][nc].count += 1
-                        self.grid[nr][nc].owner = owner
-                changed = True
-
-   def _critical_mass(self, row, col):
+    def is_valid_move(self, row, col, player):
+        owner = self.owners[row * self.cols + col]
+        return owner == EMPTY or owner == player
+
+    def get_valid_moves(self, player):
+        return [CELL_COORDS[i] for i, owner in enumerate(self.owners) if owner == EMPTY or owner == player]
+
+    def apply_move(self, row, col, player):
+        i = row * self.cols + col
+        count = self.counts[i]
+        self.counts[i] = count + 1
+        self.key ^= (ZOBRIST_COUNT[(i << 4) | (count & 15)] ^ ZOBRIST_COUNT[(i << 4) | ((count + 1) & 15)]
+                     ^ ZOBRIST_OWNER[(i << 8) | self.owners[i]] ^ ZOBRIST_OWNER[(i << 8) | player])
+        _add_square(self.totals, i, count, self.owners[i], -1)
+        _add_square(self.totals, i, count + 1, player, 1)
+        self.owners[i] = player
+        return self._resolve_chain_reactions(row, col)
+
+    def _resolve_chain_reactions(self, row, col):
+        # Wave by wave, like a full-board rescan, but each wave only checks
+        # the squares whose count changed in the previous one. Squares of a
+        # wave explode in row-major order, and the cascade stops as soon as
+        # only one player has squares left. Returns the number of explosions.
+        counts, owners, totals = self.counts, self.owners, self.totals
+        key = self.key
+        explosions = 0
+        wave = self._unstable + (row * self.cols + col,)
+        self._unstable = ()
+        while wave:
+            if (totals[TOTAL_CELLS] == 0) != (totals[TOTAL_CELLS + 1] == 0):
+                self._unstable = tuple(i for i in set(wave) if counts[i] > CRITICAL_MASS[i])
+                break
+            to_explode = sorted(i for i in set(wave) if counts[i] > CRITICAL_MASS[i])
+            explosions += len(to_explode)
+            exploding_owners = [owners[i] for i in to_explode]
+            wave = []
+            for i, owner in zip(to_explode, exploding_owners):
+                count = counts[i]
+                remaining = count - CRITICAL_MASS[i] - 1
+                _add_square(totals, i, count, owners[i], -1)
+                if remaining <= 0:
+                    key ^= ZOBRIST_OWNER[(i << 8) | owners[i]]
+                    owners[i] = EMPTY
+                    remaining = 0
+                else:
+                    _add_square(totals, i, remaining, owners[i], 1)
+                    wave.append(i)
+                counts[i] = remaining
+                key ^= ZOBRIST_COUNT[(i << 4) | (count & 15)] ^ ZOBRIST_COUNT[(i << 4) | (remaining & 15)]
+                for j in NEIGHBOURS[i]:
+                    count = counts[j]
+                    counts[j] = count + 1
+                    key ^= ZOBRIST_COUNT[(j << 4) | (count & 15)] ^ ZOBRIST_COUNT[(j << 4) | ((count + 1) & 15)]
+                    previous = owners[j]
+                    if previous == owner and owner != EMPTY:
+                        # the common case: one more orb on a square the player already holds
+                        totals[owner] += 1
+                        totals[TOTAL_MASS + owner] += MASS_UNIT[j]
+                        if count == CRITICAL_MASS[j]:
+                            totals[TOTAL_CRITICAL + owner] -= 1
+                        elif count + 1 == CRITICAL_MASS[j]:
+                            totals[TOTAL_CRITICAL + owner] += 1
+                    else:
+                        _add_square(totals, j, count, previous, -1)
+                        _add_square(totals, j, count + 1, owner, 1)
+                        if previous != owner:
+                            key ^= ZOBRIST_OWNER[(j << 8) | previous] ^ ZOBRIST_OWNER[(j << 8) | owner]
+                            owners[j] = owner
+                    wave.append(j)
+        self.key = key
+        return explosions
+
+    def _critical_mass(self, row, col):
         edges = 0
         if row == 0 or row == self.rows-1: edges += 1
         if col == 0 or col == self.cols-1: edges += 1
         return 1 + (2 - edges)
 
-   def is_game_over(self):
-        owners = set()
-        for row in self.grid:
-            for cell in row:
-                if cell.owner is not None:
-                    owners.add(cell.owner)
-        return len(owners) <= 1 and any(cell.owner is not None for row in self.grid for cell in row)
-
-   def get_winner(self):
-        for row in self.grid:
-            for cell in row:
-                if cell.owner is not None:
-                    return cell.owner
+    def is_game_over(self):
+        # exactly one player still has orbs on the board
+        return (self.totals[TOTAL_CELLS] == 0) != (self.totals[TOTAL_CELLS + 1] == 0)
+
+    def get_winner(self):
+        for owner in self.owners:
+            if owner != EMPTY:
+                return owner
         return None
 
-   def count_orbs(self, player):
-        return sum(cell.count for row in self.grid for cell in row if cell.owner == player)
+    def count_orbs(self, player):
+        return self.totals[TOTAL_ORBS + player]
+
+    def count_cells(self, player):
+        return self.totals[TOTAL_CELLS + player]
+
+    def count_critical(self, player):
+        # squares one orb away from exploding
+        return self.totals[TOTAL_CRITICAL + player]
+
+    def compute_totals(self):
+        # from scratch; self.totals is the same list kept up to date incrementally
+        totals = [0] * 10
+        for i in range(CELLS):
+            _add_square(totals, i, self.counts[i], self.owners[i], 1)
+        return totals
+
+    def zobrist_key(self):
+        # from scratch; self.key is the same value kept up to date incrementally
+        key = 0
+        for i in range(CELLS):
+            key ^= ZOBRIST_COUNT[(i << 4) | (self.counts[i] & 15)] ^ ZOBRIST_OWNER[(i << 8) | self.owners[i]]
+        return key
  
 
+# gamestate.txt text format: a "<move type>:" line, then one line per row
+# with "0" for an empty square or "<count><R|B>" (R = player 0, B = player 1).
+def board_to_text(board, move_type):
+    lines = [f"{move_type}:"]
+    for r in range(ROWS):
+        row = []
+        for c in range(COLS):
+            count, owner = board.counts[r * COLS + c], board.owners[r * COLS + c]
+            if owner == EMPTY or count == 0:
+                row.append("0")
+            else:
+                row.append(f"{count}{'R' if owner == 0 else 'B'}")
+        lines.append(" ".join(row))
+    return "\n".join(lines) + "\n"
+
+def board_from_text(text):
+    # returns (board, player to move): after an "AI..." line it is player 0's turn
+    lines = text.splitlines()
+    counts = bytearray(CELLS)
+    owners = bytearray([EMPTY]) * CELLS
+    for r in range(ROWS):
+        if r < len(lines) - 1:
+            row_data = lines[r+1].split()
+            for c in range(COLS):
+                cell_data = row_data[c]
+                if cell_data == "0":
+                    continue
+                counts[r * COLS + c] = int(cell_data[:-1])
+                owners[r * COLS + c] = 0 if cell_data[-1] == 'R' else 1
+    current_player = 0 if lines and lines[0].strip().startswith("AI") else 1
+    return Board.from_arrays(counts, owners), current_player
+
+# Compact binary format: a board is 54 bytes, one per square, holding
+# count | (owner + 1) << 6. A game file is
+#   b"CRGM", version byte, initial board, uint16 move count,
+#   one byte per move: player << 7 | square index.
+GAME_MAGIC = b"CRGM"
+GAME_VERSION = 1
+_GAME_HEADER = struct.Struct("<4sB54sH")
+
+def board_to_bytes(board):
+    return bytes(0 if owner == EMPTY else count | (owner + 1) << 6
+                 for count, owner in zip(board.counts, board.owners))
+
+def board_from_bytes(data):
+    counts = bytes(byte & 63 for byte in data[:CELLS])
+    owners = bytes(EMPTY if byte >> 6 == 0 else (byte >> 6) - 1 for byte in data[:CELLS])
+    return Board.from_arrays(counts, owners)
+
+def save_game(path, moves, initial=None):
+    # moves: [(row, col, player), ...] played from initial (default: empty board)
+    initial = initial if initial is not None else Board()
+    with open(path, "wb") as f:
+        f.write(_GAME_HEADER.pack(GAME_MAGIC, GAME_VERSION, board_to_bytes(initial), len(moves)))
+        f.write(bytes(player << 7 | (row * COLS + col) for row, col, player in moves))
+
+def load_game(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, version, initial, count = _GAME_HEADER.unpack_from(data)
+    if magic != GAME_MAGIC or version != GAME_VERSION:
+        raise ValueError(f"{path} is not a version {GAME_VERSION} game file")
+    body = data[_GAME_HEADER.size:_GAME_HEADER.size + count]
+    moves = [((byte & 127) // COLS, (byte & 127) % COLS, byte >> 7) for byte in body]
+    return board_from_bytes(initial), moves
+
+def replay(initial, moves):
+    board = initial.clone()
+    for row, col, player in moves:
+        board.apply_move(row, col, player)
+    return board
+
+
+# All heuristics read the board's running totals, so a leaf costs O(1).
+
 def simple_heuristic(board, player, opponent):
-    player_orbs = board.count_orbs(player)
-    opponent_orbs = board.count_orbs(opponent)
-    player_cells = sum(1 for row in board.grid for cell in row if cell.owner == player)
-    opponent_cells = sum(1 for row in board.grid for cell in row if cell.owner == opponent)
-    return (player_orbs - opponent_orbs) + 0.5 * (player_cells - opponent_cells)
+    totals = board.totals
+    return ((totals[TOTAL_ORBS + player] - totals[TOTAL_ORBS + opponent])
+            + 0.5 * (totals[TOTAL_CELLS + player] - totals[TOTAL_CELLS + opponent]))
 
 def cell_control_heuristic(board, player, opponent):
-    player_cells = sum(1 for row in board.grid for cell in row if cell.owner == player)
-    opponent_cells = sum(1 for row in board.grid for cell in row if cell.owner == opponent)
-    return player_cells - opponent_cells
+    totals = board.totals
+    return totals[TOTAL_CELLS + player] - totals[TOTAL_CELLS + opponent]
 
 def edge_priority_heuristic(board, player, opponent):
-    score = 0
-    for r in range(board.rows):
-        for c in range(board.cols):
-            cell = board.grid[r][c]
-            if cell.owner == player:
-                if (r in [0, board.rows-1] and c in [0, board.cols-1]):
-                    score += 3
-                elif r in [0, board.rows-1] or c in [0, board.cols-1]:
-                    score += 2
-                else:
-                    score += 1
-            elif cell.owner == opponent:
-                if (r in [0, board.rows-1] and c in [0, board.cols-1]):
-                    score -= 3
-                elif r in [0, board.rows-1] or c in [0, board.cols-1]:
-                    score -= 2
-                else:
-                    score -= 1
-    return score
+    totals = board.totals
+    return totals[TOTAL_WEIGHT + player] - totals[TOTAL_WEIGHT + opponent]
 
 def critical_mass_heuristic(board, player, opponent):
-    def cell_score(cell, r, c, owner):
-        if cell.owner != owner:
-            return 0
-        return cell.count / (board._critical_mass(r, c) + 1)
-    player_score = sum(cell_score(board.grid[r][c], r, c, player)
-                       for r in range(board.rows) for c in range(board.cols))
-    opponent_score = sum(cell_score(board.grid[r][c], r, c, opponent)
-                         for r in range(board.rows) for c in range(board.cols))
-    return player_score - opponent_score
+    totals = board.totals
+    return (totals[TOTAL_MASS + player] - totals[TOTAL_MASS + opponent]) / MASS_SCALE
 
 def aggressive_heuristic(board, player, opponent):
-    player_orbs = board.count_orbs(player)
-    opponent_orbs = board.count_orbs(opponent)
-    return 2 * player_orbs - 3 * opponent_orbs
+    totals = board.totals
+    return 2 * totals[TOTAL_ORBS + player] - 3 * totals[TOTAL_ORBS + opponent]
 
 HEURISTICS = {
     1: simple_heuristic,
@@ -145,39 +348,451 @@ HEURISTICS = {
     5: aggressive_heuristic
 }
 
-def minimax(board, depth, alpha, beta, maximizing, player, opponent, no_moves, heuristic_func):
+# Batched leaf evaluation. At depth 1, minimax scores the children of a
+# node in one call. Most moves add an orb to a square below critical mass,
+# so a child's totals are the parent's plus that square's entries in the
+# position-weight and mass tables: the totals of all such children are
+# stacked as NumPy vectors (the parent's value where all children agree)
+# and the heuristic runs once on them. The heuristics above read nothing
+# but totals, so they work unchanged on the stacked totals and give exactly
+# their scalar values. Moves that explode are left to minimax, which plays
+# them out on a cloned board only while they can still matter. Without
+# NumPy, evaluate_children returns None and minimax evaluates each child
+# on its own.
+
+BATCH_HEURISTICS = set(HEURISTICS.values())
+
+if np is not None:
+    _CRITICAL_MASS_ARRAY = np.array(CRITICAL_MASS, dtype=np.int64)
+    _POSITION_WEIGHT_ARRAY = np.array(POSITION_WEIGHT, dtype=np.int64)
+    _MASS_UNIT_ARRAY = np.array(MASS_UNIT, dtype=np.int64)
+
+class _StackedTotals:
+    __slots__ = ('totals',)
+
+    def __init__(self, totals):
+        self.totals = totals
+
+def evaluate_children(board, moves, side, heuristic_func, player, opponent):
+    # values[n] is heuristic_func(child, player, opponent) for the child
+    # after moves[n] by side, or None where that move explodes. Returns None
+    # if heuristic_func can't be batched. Wrappers made with functools.wraps are looked
+    # through and called once per batch on the parent, so a wrapper that
+    # checks for cancellation still runs.
+    base = getattr(heuristic_func, "__wrapped__", heuristic_func)
+    if np is None or base not in BATCH_HEURISTICS or board._unstable or not moves:
+        return None
+    if base is not heuristic_func:
+        heuristic_func(board, player, opponent)
+    cols = board.cols
+    squares = np.array([row * cols + col for row, col in moves], dtype=np.intp)
+    counts = np.frombuffer(board.counts, dtype=np.uint8)[squares].astype(np.int64)
+    empty = np.frombuffer(board.owners, dtype=np.uint8)[squares] == EMPTY
+    critical = _CRITICAL_MASS_ARRAY[squares]
+    totals = board.totals[:]
+    totals[TOTAL_ORBS + side] += 1
+    totals[TOTAL_CELLS + side] += empty
+    totals[TOTAL_WEIGHT + side] += _POSITION_WEIGHT_ARRAY[squares] * empty
+    totals[TOTAL_MASS + side] += _MASS_UNIT_ARRAY[squares]
+    totals[TOTAL_CRITICAL + side] += counts + 1 == critical
+    values = base(_StackedTotals(totals), player, opponent)
+    # a heuristic that only reads entries every move changes alike gives one value
+    values = values.tolist() if isinstance(values, np.ndarray) else [values] * len(moves)
+    for n in np.flatnonzero(counts >= critical).tolist():
+        values[n] = None
+    return values
+
+EXACT, LOWER_BOUND, UPPER_BOUND = 0, 1, 2
+
+class TranspositionTable:
+    # Fixed-size table indexed by the low bits of the Zobrist key. Entries
+    # are (key, depth, value, flag, best_move, generation). A slot is
+    # overwritten by the same position, by anything once its entry is from
+    # an older search, and otherwise only by an equal or deeper search.
+    # Keep one table per AI player: stored values depend on the heuristic
+    # and on which side is the maximizing player.
+    def __init__(self, size_bits=18):
+        self.size = 1 << size_bits
+        self.mask = self.size - 1
+        self.entries = [None] * self.size
+        self.generation = 0
+        self.probes = self.hits = self.cutoffs = self.stores = self.replacements = 0
+
+    def new_search(self):
+        self.generation += 1
+
+    def clear(self):
+        self.entries = [None] * self.size
+        self.probes = self.hits = self.cutoffs = self.stores = self.replacements = 0
+
+    def probe(self, key):
+        self.probes += 1
+        entry = self.entries[key & self.mask]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        return None
+
+    def store(self, key, depth, value, flag, best_move):
+        slot = key & self.mask
+        old = self.entries[slot]
+        if old is not None and old[0] != key:
+            if old[5] == self.generation and old[1] > depth:
+                return
+            self.replacements += 1
+        self.entries[slot] = (key, depth, value, flag, best_move, self.generation)
+        self.stores += 1
+
+    def hit_rate(self):
+        return self.hits / self.probes if self.probes else 0.0
+
+    def stats(self):
+        used = sum(1 for entry in self.entries if entry is not None)
+        return {
+            "size": self.size,
+            "used": used,
+            "fill": used / self.size,
+            "probes": self.probes,
+            "hits": self.hits,
+            "hit_rate": self.hit_rate(),
+            "cutoffs": self.cutoffs,
+            "stores": self.stores,
+            "replacements": self.replacements,
+        }
+
+class SearchStats:
+    # Opt-in search counters; pass one as minimax(..., stats=...) and it is
+    # filled as the search runs. With timing on, clone, apply_move (which
+    # includes the chain reaction) and heuristic calls are timed as well
+    # (batched evaluations count as heuristic time), which slows the search
+    # a little; without it only counting is added.
+    # Searches without a stats object skip all of this.
+    def __init__(self, timing=False):
+        self.timing = timing
+        self.nodes = 0          # minimax calls
+        self.leaves = 0         # heuristic evaluations
+        self.expanded = 0       # nodes whose moves were generated
+        self.moves = 0          # moves generated at expanded nodes
+        self.searched = 0       # children actually searched
+        self.cutoffs = 0        # alpha-beta cutoffs
+        self.tt_cutoffs = 0     # nodes answered by the transposition table
+        self.researches = 0     # PVS null-window searches that had to be repeated
+        self.clone_time = 0.0
+        self.apply_time = 0.0
+        self.heuristic_time = 0.0
+        self.search_time = 0.0
+        self.depth = 0
+
+    def evaluate(self, heuristic_func, board, player, opponent):
+        self.leaves += 1
+        if not self.timing:
+            return heuristic_func(board, player, opponent)
+        start = time.perf_counter()
+        value = heuristic_func(board, player, opponent)
+        self.heuristic_time += time.perf_counter() - start
+        return value
+
+    def evaluate_children(self, board, moves, side, heuristic_func, player, opponent):
+        if not self.timing:
+            return evaluate_children(board, moves, side, heuristic_func, player, opponent)
+        start = time.perf_counter()
+        values = evaluate_children(board, moves, side, heuristic_func, player, opponent)
+        self.heuristic_time += time.perf_counter() - start
+        return values
+
+    def batched_child(self):
+        # a child scored by evaluate_children, counted as if it had been searched
+        self.nodes += 1
+        self.leaves += 1
+        self.searched += 1
+
+    def child(self, board, move, player):
+        self.searched += 1
+        if not self.timing:
+            new_board = board.clone()
+            new_board.apply_move(*move, player)
+            return new_board
+        start = time.perf_counter()
+        new_board = board.clone()
+        cloned = time.perf_counter()
+        new_board.apply_move(*move, player)
+        self.apply_time += time.perf_counter() - cloned
+        self.clone_time += cloned - start
+        return new_board
+
+    def branching(self):
+        return self.moves / self.expanded if self.expanded else 0.0
+
+    def nodes_per_sec(self):
+        return self.nodes / self.search_time if self.search_time else 0.0
+
+    def as_dict(self):
+        return {
+            "nodes": self.nodes,
+            "leaves": self.leaves,
+            "expanded": self.expanded,
+            "branching": round(self.branching(), 3),
+            "effective_branching": round(self.searched / self.expanded, 3) if self.expanded else 0.0,
+            "cutoffs": self.cutoffs,
+            "tt_cutoffs": self.tt_cutoffs,
+            "researches": self.researches,
+            "depth": self.depth,
+            "search_time": self.search_time,
+            "nodes_per_sec": round(self.nodes_per_sec()),
+            "clone_time": self.clone_time,
+            "apply_time": self.apply_time,
+            "heuristic_time": self.heuristic_time,
+        }
+
+EXPLOSIVE_BONUS = 1 << 44
+KILLER_BONUS = 1 << 43
+
+class MoveOrdering:
+    # Killer moves and history scores for minimax(..., ordering=...).
+    # Moves are tried: transposition table move, placements that explode
+    # (the square already holds its critical mass, so no apply_move is
+    # needed to tell), the killers for this depth, then by history score.
+    # Killers are kept per remaining depth, history per player and square.
+    # Passing an ordering also turns on principal variation search unless
+    # pvs is False.
+    def __init__(self, pvs=True):
+        self.pvs = pvs
+        self.killers = {}
+        self.history = [[0] * CELLS, [0] * CELLS]
+
+    def new_search(self):
+        # old history still helps, but should not outweigh the new search
+        self.history = [[score >> 1 for score in side] for side in self.history]
+
+    def clear(self):
+        self.killers = {}
+        self.history = [[0] * CELLS, [0] * CELLS]
+
+    def order(self, board, moves, side, depth):
+        counts = board.counts
+        history = self.history[side]
+        killers = self.killers.get(depth, ())
+        def score(move):
+            i = move[0] * COLS + move[1]
+            count = counts[i]
+            value = history[i] << 5 | min(count, 31)
+            if count >= CRITICAL_MASS[i]:
+                value += EXPLOSIVE_BONUS
+            if move in killers:
+                value += KILLER_BONUS
+            return value
+        moves.sort(key=score, reverse=True)
+
+    def cutoff(self, move, side, depth):
+        self.history[side][move[0] * COLS + move[1]] += depth * depth
+        killers = self.killers.setdefault(depth, [])
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[2:]
+
+# Null windows are this wide. Distinct heuristic values differ by far more.
+PVS_EPSILON = 1e-6
+
+class SearchTimeout(Exception):
+    pass
+
+CANCEL_CHECK_INTERVAL = 1024  # heuristic calls between cancellation checks
+
+def cancellable(heuristic_func, counter, generation):
+    # heuristic_func that raises SearchTimeout once the shared counter has
+    # moved on from generation, checked every CANCEL_CHECK_INTERVAL calls
+    calls = 0
+    @functools.wraps(heuristic_func)
+    def heuristic(board, player, opponent):
+        nonlocal calls
+        calls += 1
+        if calls % CANCEL_CHECK_INTERVAL == 0 and counter.value != generation:
+            raise SearchTimeout()
+        return heuristic_func(board, player, opponent)
+    return heuristic
+
+def _bound_flag(value, alpha, beta):
+    if value <= alpha:
+        return UPPER_BOUND
+    if value >= beta:
+        return LOWER_BOUND
+    return EXACT
+
+def _batch_values(board, moves, side, heuristic_func, player, opponent, stats):
+    if stats is None:
+        return evaluate_children(board, moves, side, heuristic_func, player, opponent)
+    return stats.evaluate_children(board, moves, side, heuristic_func, player, opponent)
+
+def minimax(board, depth, alpha, beta, maximizing, player, opponent, no_moves, heuristic_func, tt=None,
+            deadline=None, stats=None, ordering=None):
+    if deadline is not None and time.perf_counter() > deadline:
+        raise SearchTimeout()
+    if stats is not None:
+        stats.nodes += 1
     if depth == 0 or (no_moves > 1 and board.is_game_over()):
+        if stats is not None:
+            return stats.evaluate(heuristic_func, board, player, opponent), None
         return heuristic_func(board, player, opponent), None
 
-    valid_moves = board.get_valid_moves(player if maximizing else opponent)
-    valid_moves.sort(key=lambda move: board.grid[move[0]][move[1]].count, reverse=maximizing)
+    tt_move = None
+    if tt is not None:
+        key = board.key ^ (ZOBRIST_MAXIMIZING if maximizing else 0) ^ (ZOBRIST_EARLY if no_moves <= 1 else 0)
+        entry = tt.probe(key)
+        if entry is not None:
+            tt_depth, tt_value, tt_flag, tt_move = entry[1:5]
+            if tt_depth >= depth:
+                if tt_flag == EXACT:
+                    tt.cutoffs += 1
+                    if stats is not None:
+                        stats.tt_cutoffs += 1
+                    return tt_value, tt_move
+                if tt_flag == LOWER_BOUND:
+                    alpha = max(alpha, tt_value)
+                else:
+                    beta = min(beta, tt_value)
+                if beta <= alpha:
+                    tt.cutoffs += 1
+                    if stats is not None:
+                        stats.tt_cutoffs += 1
+                    return tt_value, tt_move
+        alpha_orig, beta_orig = alpha, beta
+
+    side = player if maximizing else opponent
+    valid_moves = board.get_valid_moves(side)
+    if ordering is None:
+        valid_moves.sort(key=lambda move: board.counts[move[0] * board.cols + move[1]], reverse=maximizing)
+    else:
+        ordering.order(board, valid_moves, side, depth)
 
     if not valid_moves:
+        if stats is not None:
+            return stats.evaluate(heuristic_func, board, player, opponent), None
         return heuristic_func(board, player, opponent), None
+    if stats is not None:
+        stats.expanded += 1
+        stats.moves += len(valid_moves)
+    if tt_move is not None and tt_move in valid_moves:
+        valid_moves.remove(tt_move)
+        valid_moves.insert(0, tt_move)
+    # with an ordering, moves after the first are searched with a null
+    # window and only searched again if they might beat the best so far
+    pvs = ordering is not None and ordering.pvs and depth > 1
+    # at depth 1, once the first child has failed to cut off, the quiet
+    # children are scored in one batch; the loop still visits the moves in
+    # order, so it picks the same move and cuts off at the same point, and
+    # only plays out the moves that explode
+    values = None
     best_move = None
     if maximizing:
         max_eval = -math.inf
-        for move in valid_moves:
-            new_board = board.clone()
-            new_board.apply_move(*move, player)
-            eval, _ = minimax(new_board, depth-1, alpha, beta, False, player, opponent, no_moves, heuristic_func)
+        for n, move in enumerate(valid_moves):
+            if n == 1 and depth == 1:
+                values = _batch_values(board, valid_moves, side, heuristic_func, player, opponent, stats)
+            if values is not None and values[n] is not None:
+                eval = values[n]
+                if stats is not None:
+                    stats.batched_child()
+            else:
+                if stats is None:
+                    new_board = board.clone()
+                    new_board.apply_move(*move, player)
+                else:
+                    new_board = stats.child(board, move, player)
+                if pvs and best_move is not None:
+                    eval, _ = minimax(new_board, depth-1, alpha, alpha + PVS_EPSILON, False, player, opponent,
+                                      no_moves, heuristic_func, tt, deadline, stats, ordering)
+                    if alpha < eval < beta:
+                        if stats is not None:
+                            stats.researches += 1
+                        eval, _ = minimax(new_board, depth-1, alpha, beta, False, player, opponent, no_moves,
+                                          heuristic_func, tt, deadline, stats, ordering)
+                else:
+                    eval, _ = minimax(new_board, depth-1, alpha, beta, False, player, opponent, no_moves,
+                                      heuristic_func, tt, deadline, stats, ordering)
             if eval > max_eval:
                 max_eval = eval
                 best_move = move
             alpha = max(alpha, eval)
             if beta <= alpha:
+                if stats is not None:
+                    stats.cutoffs += 1
+                if ordering is not None:
+                    ordering.cutoff(move, side, depth)
                 break 
+        if tt is not None:
+            tt.store(key, depth, max_eval, _bound_flag(max_eval, alpha_orig, beta_orig), best_move)
         return max_eval, best_move
     else:
         min_eval = math.inf
-        for move in valid_moves:
-            new_board = board.clone()
-            new_board.apply_move(*move, opponent)
-            eval, _ = minimax(new_board, depth-1, alpha, beta, True, player, opponent, no_moves, heuristic_func)
+        for n, move in enumerate(valid_moves):
+            if n == 1 and depth == 1:
+                values = _batch_values(board, valid_moves, side, heuristic_func, player, opponent, stats)
+            if values is not None and values[n] is not None:
+                eval = values[n]
+                if stats is not None:
+                    stats.batched_child()
+            else:
+                if stats is None:
+                    new_board = board.clone()
+                    new_board.apply_move(*move, opponent)
+                else:
+                    new_board = stats.child(board, move, opponent)
+                if pvs and best_move is not None:
+                    eval, _ = minimax(new_board, depth-1, beta - PVS_EPSILON, beta, True, player, opponent, no_moves,
+                                      heuristic_func, tt, deadline, stats, ordering)
+                    if alpha < eval < beta:
+                        if stats is not None:
+                            stats.researches += 1
+                        eval, _ = minimax(new_board, depth-1, alpha, beta, True, player, opponent, no_moves,
+                                          heuristic_func, tt, deadline, stats, ordering)
+                else:
+                    eval, _ = minimax(new_board, depth-1, alpha, beta, True, player, opponent, no_moves, heuristic_func,
+                                      tt, deadline, stats, ordering)
             if eval < min_eval:
                 min_eval = eval
                 best_move = move
             beta = min(beta, eval)
             if beta <= alpha:
+                if stats is not None:
+                    stats.cutoffs += 1
+                if ordering is not None:
+                    ordering.cutoff(move, side, depth)
                 break 
+        if tt is not None:
+            tt.store(key, depth, min_eval, _bound_flag(min_eval, alpha_orig, beta_orig), best_move)
         return min_eval, best_move
+
+MAX_SEARCH_DEPTH = 12
+
+def iterative_deepening(board, time_limit, maximizing, player, opponent, no_moves, heuristic_func,
+                        max_depth=MAX_SEARCH_DEPTH, tt=None, stats=None, ordering=None):
+    # Searches depth 1, 2, ... until time_limit seconds have passed and
+    # returns (value, move, depth) from the deepest completed iteration.
+    # Best moves stored in the table by one iteration are tried first by the
+    # next, so each iteration starts down the previous principal variation.
+    # Depth 1 always completes so there is a move to play. stats, if given,
+    # accumulates over all iterations including the abandoned one.
+    if tt is None:
+        tt = TranspositionTable(16)
+    if ordering is None:
+        ordering = MoveOrdering()
+    tt.new_search()
+    ordering.new_search()
+    start = time.perf_counter()
+    deadline = start + time_limit
+    value, move = minimax(board, 1, -math.inf, math.inf, maximizing, player, opponent,
+                          no_moves, heuristic_func, tt, None, stats, ordering)
+    completed = 1
+    for depth in range(2, max_depth + 1):
+        if move is None:
+            break
+        try:
+            value, move = minimax(board, depth, -math.inf, math.inf, maximizing, player, opponent,
+                                  no_moves, heuristic_func, tt, deadline, stats, ordering)
+        except SearchTimeout:
+            break
+        completed = depth
+    if stats is not None:
+        stats.depth = completed
+        stats.search_time += time.perf_counter() - start
+    return value, move, completed
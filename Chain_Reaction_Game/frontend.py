@@ -2,12 +2,15 @@ import pygame
 import sys
 import math
 import random
-from backend import Board, HEURISTICS, minimax
+import os
+from backend import CELLS, EMPTY, Board, HEURISTICS, board_from_text, board_to_text, save_game
+from ai_worker import SearchClient
 
 ROWS, COLS = 9, 6
 CELL_SIZE = 80
 WIDTH, HEIGHT = COLS * CELL_SIZE, ROWS * CELL_SIZE
 PLAYER_COLORS = [(200, 0, 0), (0, 120, 255)]
+AI_TIME_LIMIT = 2.0  # seconds per AI move; the depth chosen in the menu is the cap
 
 def random_move(board, player):
     moves = board.get_valid_moves(player)
@@ -15,44 +18,124 @@ def random_move(board, player):
         return random.choice(moves)
     return None
 
-def draw_board(screen, board):
+# draw_board renders from cached surfaces: the gradient and grid are drawn
+# once, each (owner, count) stack of orbs is a sprite, and after the first
+# frame only squares whose contents changed are repainted and updated.
+# Orbs spill into neighbouring squares, so a repaint covers everything
+# drawn into the dirty area, in the original row-major order.
+ORB_MARGIN = 30
+_render = {"background": None, "sprites": {}, "screen": None, "state": None,
+           "overlay": None, "overlay_rect": None, "overlay_changed": False}
+
+def _draw_background():
+    background = pygame.Surface((WIDTH, HEIGHT))
     for y in range(HEIGHT):
         color_val = 30 + int(40 * math.sin(y / 60))
         color_val = max(0, min(255, color_val))
         blue_val = min(255, max(0, 60 + color_val // 2))
-        pygame.draw.line(screen, (color_val, color_val, blue_val), (0, y), (WIDTH, y))
-    for r in range(board.rows + 1):
+        pygame.draw.line(background, (color_val, color_val, blue_val), (0, y), (WIDTH, y))
+    for r in range(ROWS + 1):
         glow = 120 + int(40 * abs(math.sin(r)))
         glow = min(255, max(0, glow))
-        pygame.draw.line(screen, (glow, glow, 180), (0, r * CELL_SIZE), (WIDTH, r * CELL_SIZE), 4)
-    for c in range(board.cols + 1):
+        pygame.draw.line(background, (glow, glow, 180), (0, r * CELL_SIZE), (WIDTH, r * CELL_SIZE), 4)
+    for c in range(COLS + 1):
         glow = 120 + int(40 * abs(math.cos(c)))
         glow = min(255, max(0, glow))
-        pygame.draw.line(screen, (glow, glow, 180), (c * CELL_SIZE, 0), (c * CELL_SIZE, HEIGHT), 4)
-    for r in range(board.rows):
-        for c in range(board.cols):
-            x = c * CELL_SIZE
-            y = r * CELL_SIZE
-            cell = board.grid[r][c]
-            if (r + c) % 2 == 0:
-                pygame.draw.rect(screen, (40, 60, 80), (x+2, y+2, CELL_SIZE-4, CELL_SIZE-4), border_radius=18)
-            if cell.owner is not None and cell.count > 0:
-                color = PLAYER_COLORS[cell.owner]
-                for i in range(cell.count):
-                    offset = (i - (cell.count-1)/2) * 18
-                    orb_x = int(x + CELL_SIZE/2 + offset)
-                    orb_y = int(y + CELL_SIZE/2)
-                    pygame.draw.circle(screen, (30, 30, 30), (orb_x+4, orb_y+4), 18)
-                    for glow_radius in range(22, 30, 2):
-                        glow_color = (
-                            min(color[0]+60,255),
-                            min(color[1]+60,255),
-                            min(color[2]+60,255),
-                        )
-                        pygame.draw.circle(screen, glow_color, (orb_x, orb_y), glow_radius, 2)
-                    pygame.draw.circle(screen, color, (orb_x, orb_y), 18)
-                    pygame.draw.circle(screen, (255,255,255), (orb_x-6, orb_y-6), 5)
-    pygame.display.flip()
+        pygame.draw.line(background, (glow, glow, 180), (c * CELL_SIZE, 0), (c * CELL_SIZE, HEIGHT), 4)
+    return background
+
+def _orb_sprite(owner, count):
+    # (surface, rect relative to the square's top-left corner)
+    key = (owner, count)
+    if key not in _render["sprites"]:
+        # orb centres as the direct drawing code placed them in a square at x = WIDTH
+        xs = [int(WIDTH + CELL_SIZE/2 + (i - (count-1)/2) * 18) - WIDTH for i in range(count)]
+        rect = pygame.Rect(xs[0] - ORB_MARGIN, CELL_SIZE//2 - ORB_MARGIN,
+                           xs[-1] - xs[0] + 2 * ORB_MARGIN, 2 * ORB_MARGIN)
+        sprite = pygame.Surface(rect.size, pygame.SRCALPHA)
+        color = PLAYER_COLORS[owner]
+        glow_color = (min(color[0]+60,255), min(color[1]+60,255), min(color[2]+60,255))
+        for orb_x in xs:
+            orb_x -= rect.x
+            orb_y = CELL_SIZE//2 - rect.y
+            pygame.draw.circle(sprite, (30, 30, 30), (orb_x+4, orb_y+4), 18)
+            for glow_radius in range(22, 30, 2):
+                pygame.draw.circle(sprite, glow_color, (orb_x, orb_y), glow_radius, 2)
+            pygame.draw.circle(sprite, color, (orb_x, orb_y), 18)
+            pygame.draw.circle(sprite, (255,255,255), (orb_x-6, orb_y-6), 5)
+        _render["sprites"][key] = (sprite, rect)
+    return _render["sprites"][key]
+
+def _square_extent(index, count, owner):
+    r, c = divmod(index, COLS)
+    extent = pygame.Rect(c * CELL_SIZE, r * CELL_SIZE, CELL_SIZE, CELL_SIZE)
+    if owner != EMPTY and count > 0:
+        extent.union_ip(_orb_sprite(owner, count)[1].move(extent.topleft))
+    return extent
+
+def _paint(screen, counts, owners, area):
+    screen.set_clip(area)
+    screen.blit(_render["background"], area, area)
+    for index in range(CELLS):
+        count, owner = counts[index], owners[index]
+        if not area.colliderect(_square_extent(index, count, owner)):
+            continue
+        r, c = divmod(index, COLS)
+        x, y = c * CELL_SIZE, r * CELL_SIZE
+        if (r + c) % 2 == 0:
+            pygame.draw.rect(screen, (40, 60, 80), (x+2, y+2, CELL_SIZE-4, CELL_SIZE-4), border_radius=18)
+        if owner != EMPTY and count > 0:
+            sprite, rect = _orb_sprite(owner, count)
+            screen.blit(sprite, rect.move(x, y))
+    screen.set_clip(None)
+
+def set_overlay(lines):
+    # text box drawn over the board's top-left corner by draw_board; None removes it
+    overlay = None
+    if lines:
+        font = pygame.font.SysFont(None, 22)
+        rendered = [font.render(line, True, (230, 230, 230)) for line in lines]
+        overlay = pygame.Surface((max(text.get_width() for text in rendered) + 12,
+                                  sum(text.get_height() for text in rendered) + 10), pygame.SRCALPHA)
+        overlay.fill((0, 0, 0, 170))
+        y = 5
+        for text in rendered:
+            overlay.blit(text, (6, y))
+            y += text.get_height()
+    _render["overlay"] = overlay
+    _render["overlay_changed"] = True
+
+def _blit_overlay(screen):
+    overlay = _render["overlay"]
+    _render["overlay_rect"] = screen.blit(overlay, (6, 6)) if overlay is not None else None
+    _render["overlay_changed"] = False
+    return _render["overlay_rect"]
+
+def draw_board(screen, board, full=False):
+    if _render["background"] is None:
+        _render["background"] = _draw_background()
+    counts, owners = bytes(board.counts), bytes(board.owners)
+    previous = _render["state"]
+    if full or previous is None or _render["screen"] is not screen:
+        _paint(screen, counts, owners, screen.get_rect())
+        _blit_overlay(screen)
+        pygame.display.flip()
+    else:
+        old_counts, old_owners = previous
+        dirty = [_square_extent(i, old_counts[i], old_owners[i]).union(_square_extent(i, counts[i], owners[i]))
+                 for i in range(CELLS) if counts[i] != old_counts[i] or owners[i] != old_owners[i]]
+        if dirty or _render["overlay_changed"]:
+            if _render["overlay_rect"] is not None:
+                dirty.append(_render["overlay_rect"])
+            for area in dirty:
+                _paint(screen, counts, owners, area.clip(screen.get_rect()))
+            overlay_rect = _blit_overlay(screen)
+            if overlay_rect is not None:
+                dirty.append(overlay_rect)
+        if dirty:
+            pygame.display.update(dirty)
+    _render["screen"] = screen
+    _render["state"] = (counts, owners)
 
 def get_cell_from_mouse(pos):
     mx, my = pos
@@ -95,6 +178,12 @@ def menu():
     selected_heuristic = 0
     selected_heuristic2 = 0
     selected_depth = 2
+    ponder = False
+    # search processes per AI move: 1 is the serial search, more split the root moves
+    worker_choices = sorted({1, 2, 4, os.cpu_count() or 1})
+    workers = 1
+    engines = ["minimax", "mcts"]
+    engine = "minimax"
     anim = 0
     running = True
     while running:
@@ -110,6 +199,8 @@ def menu():
         screen.blit(shadow, (screen.get_width()//2 - title.get_width()//2 + 4, 24 + int(2*math.sin(anim))))
         screen.blit(title, (screen.get_width()//2 - title.get_width()//2, 20))
         screen.blit(font_label.render("Select Game Mode", True, (0,0,0)), (40, 80))
+        draw_button(screen, pygame.Rect(480, 78, 200, 36), "MCTS" if engine == "mcts" else "Minimax",
+                    engine == "mcts", color=(235, 235, 235), anim=anim)
         for i, mode in enumerate(game_modes):
             draw_button(
                 screen,
@@ -119,7 +210,10 @@ def menu():
                 color=mode_colors[i],
                 anim=anim
             )
-        screen.blit(font_label.render("Select AI Depth", True, (0,0,0)), (40, 190))
+        screen.blit(font_label.render("Select Max AI Depth", True, (0,0,0)), (40, 190))
+        screen.blit(font_label.render("Cores", True, (0,0,0)), (580, 190))
+        draw_button(screen, pygame.Rect(580, 230, 100, 45), str(workers), workers > 1,
+                    color=(235, 235, 235), anim=anim)
         for i, d in enumerate(ai_depths):
             draw_button(
                 screen,
@@ -142,6 +236,15 @@ def menu():
                     anim=anim
                 )
             start_y = 630
+            if selected_mode == 0:
+                draw_button(
+                    screen,
+                    pygame.Rect(40, 583, 600, 40),
+                    "Ponder: On" if ponder else "Ponder: Off",
+                    ponder,
+                    color=(235, 235, 235),
+                    anim=anim
+                )
         elif selected_mode == 1:
             screen.blit(font_label.render("Select Heuristic (AI 1)", True, (0,0,0)), (40, 290))
             for i, h in enumerate(heuristics):
@@ -179,10 +282,16 @@ def menu():
                 for i, d in enumerate(ai_depths):
                     if pygame.Rect(40 + i*90, 230, 70, 45).collidepoint(mx, my):
                         selected_depth = d
+                if pygame.Rect(480, 78, 200, 36).collidepoint(mx, my):
+                    engine = engines[(engines.index(engine) + 1) % len(engines)]
+                if pygame.Rect(580, 230, 100, 45).collidepoint(mx, my):
+                    workers = worker_choices[(worker_choices.index(workers) + 1) % len(worker_choices)]
                 if selected_mode == 0 or selected_mode == 2:
                     for i in range(len(heuristics)):
                         if pygame.Rect(40, 330 + i*50, 600, 45).collidepoint(mx, my):
                             selected_heuristic = i
+                    if selected_mode == 0 and pygame.Rect(40, 583, 600, 40).collidepoint(mx, my):
+                        ponder = not ponder
                     if pygame.Rect(200, 630, 300, 50).collidepoint(mx, my):
                         running = False
                 elif selected_mode == 1:
@@ -195,45 +304,62 @@ def menu():
                         running = False
         clock.tick(60)
     if selected_mode == 0 or selected_mode == 2:
-        return selected_mode+1, selected_depth, selected_heuristic+1, selected_heuristic+1
+        return selected_mode+1, selected_depth, selected_heuristic+1, selected_heuristic+1, ponder, workers, engine
     else:
-        return selected_mode+1, selected_depth, selected_heuristic+1, selected_heuristic2+1
+        return selected_mode+1, selected_depth, selected_heuristic+1, selected_heuristic2+1, ponder, workers, engine
 
-def board_to_file(board, move_type): 
-    with open("gamestate.txt", "w") as f:
-        f.write(f"{move_type}:\n")
-        for r in range(ROWS):
-            row = []
-            for c in range(COLS):
-                cell = board.grid[r][c]
-                if cell.owner is None or cell.count == 0:
-                    row.append("0")
-                else:
-                    color = "R" if cell.owner == 0 else "B"
-                    row.append(f"{cell.count}{color}")
-            f.write(" ".join(row) + "\n")
+def board_to_file(board, move_type, filename="gamestate.txt"):
+    with open(filename, "w") as f:
+        f.write(board_to_text(board, move_type))
 def file_to_board(filename):
-    board = Board()
     with open(filename, "r") as f:
-        lines = f.readlines()
-        for r in range(ROWS):
-            if r < len(lines) - 1:
-                row_data = lines[r+1].strip().split()
-                for c in range(COLS):
-                    cell_data = row_data[c]
-                    if cell_data == "0":
-                        continue
-                    count = int(cell_data[0])
-                    owner = 0 if cell_data[-1] == 'R' else 1
-                    board.grid[r][c].owner = owner
-                    board.grid[r][c].count = count
-        current_player = 0
-        if lines[0].strip().startswith("AI"):
-            current_player = 0
-        else:
-            current_player = 1    
-    return board, current_player
-def main(game_mode=1, ai_depth=3, heuristic1=1, heuristic2=1):
+        return board_from_text(f.read())
+
+class GameStateFile:
+    # gamestate.txt exchange with an external agent. The game keeps its
+    # state in memory; the file is written after each move and only read
+    # back when its size or mtime shows someone else has rewritten it.
+    def __init__(self, filename="gamestate.txt"):
+        self.filename = filename
+        self.stamp = None
+
+    def _stat(self):
+        try:
+            st = os.stat(self.filename)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size, st.st_ino
+
+    def write(self, board, move_type):
+        board_to_file(board, move_type, self.filename)
+        self.stamp = self._stat()
+
+    def poll(self):
+        # (board, current_player) if the file changed since we last saw it
+        stamp = self._stat()
+        if stamp is None or stamp == self.stamp:
+            return None
+        self.stamp = stamp
+        return file_to_board(self.filename)
+def stats_lines(ai_id, stats):
+    if stats.get("engine") == "book":
+        return [f"{ai_id}: opening book move (searched to depth {stats['depth']})"]
+    if stats.get("engine") == "mcts":
+        return [
+            f"{ai_id}: MCTS {stats['playouts']} playouts, {stats['playouts_per_sec']} playouts/s",
+            f"reused {stats['reused']} from the last move, win rate {stats['win_rate']:.2f}",
+        ]
+    total = stats["search_time"] or 1
+    return [
+        f"{ai_id}: depth {stats['depth']}, {stats['nodes']} nodes, {stats['nodes_per_sec']} nodes/s",
+        f"cutoffs {stats['cutoffs']} (TT {stats['tt_cutoffs']}), branching {stats['branching']:.1f}"
+        f" -> {stats['effective_branching']:.1f}",
+        f"clone {100 * stats['clone_time'] / total:.0f}%  apply {100 * stats['apply_time'] / total:.0f}%"
+        f"  heuristic {100 * stats['heuristic_time'] / total:.0f}%",
+    ]
+
+def main(game_mode=1, ai_depth=3, heuristic1=1, heuristic2=1, ponder=False, time_limit=AI_TIME_LIMIT,
+         record_path=None, show_stats=False, workers=1, engine="minimax"):
     pygame.init()
     screen = pygame.display.set_mode((WIDTH, HEIGHT))
     pygame.display.set_caption("Chain Reaction AI")
@@ -244,12 +370,28 @@ def main(game_mode=1, ai_depth=3, heuristic1=1, heuristic2=1):
     i = 0
     heuristic_func1 = HEURISTICS.get(heuristic1, HEURISTICS[1])
     heuristic_func2 = HEURISTICS.get(heuristic2, HEURISTICS[1])
-    draw_board(screen, board)
-    board_to_file(board, "Initial State")
+    # AI moves are computed in a background process and polled every frame
+    search = SearchClient(stats=show_stats, workers=workers, engine=engine)
+    set_overlay(None)
+    # the board lives in memory; gamestate.txt is only written after a move
+    # and read back when an outside agent has rewritten it
+    state_file = GameStateFile()
+    initial = board.clone()
+    history = []
+    def play(move, player, move_type):
+        board.apply_move(*move, player)
+        history.append((*move, player))
+        state_file.write(board, move_type)
+    draw_board(screen, board, full=True)
+    state_file.write(board, "Initial State")
     while running:
-        if game_mode == 1 :
-            board, current_player=file_to_board("gamestate.txt")
-            draw_board(screen, board)
+        if game_mode == 1:
+            changed = state_file.poll()
+            if changed is not None:
+                board, current_player = changed
+                initial = board.clone()
+                history = []
+                draw_board(screen, board)
         if i==0:
             current_player = 0
         if i>1 and board.is_game_over():
@@ -275,58 +417,75 @@ def main(game_mode=1, ai_depth=3, heuristic1=1, heuristic2=1):
             if event.type == pygame.QUIT:
                 running = False
                 break
+            if event.type == pygame.VIDEOEXPOSE:
+                draw_board(screen, board, full=True)
             if game_mode==1 and current_player == 0 and event.type == pygame.MOUSEBUTTONDOWN:
                 i+=1
                 row, col = get_cell_from_mouse(event.pos)
                 if 0 <= row < ROWS and 0 <= col < COLS and board.is_valid_move(row, col, current_player):
-                    board.apply_move(row, col, current_player)
+                    play((row, col), current_player, "Human Move")
                     draw_board(screen, board)
-                    board_to_file(board, "Human Move")
                     current_player = 1
         # AI vs AI
         if game_mode==2 and current_player == 0 and running and(i==0 or not board.is_game_over() ):
-            i += 1
-            _, move = minimax(board, ai_depth, -math.inf, math.inf, False, 1, 0, i, heuristic_func1)
-            if move:
-                board.apply_move(*move, current_player)
-                board_to_file(board, "AI-1 Move")
-            current_player = 1
-            draw_board(screen, board)
+            result = search.request("AI-1", board, time_limit, False, 1, 0, i + 1, heuristic_func1, ai_depth)
+            if result is not None:
+                if search.last_stats is not None:
+                    set_overlay(stats_lines("AI-1", search.last_stats))
+                i += 1
+                _, move, _ = result
+                if move:
+                    play(move, current_player, "AI-1 Move")
+                current_player = 1
+                draw_board(screen, board)
         if game_mode==2 and current_player == 1 and running and(i==1 or not board.is_game_over()):
-            _, move = minimax(board, ai_depth, -math.inf, math.inf, True, 1, 0, i, heuristic_func2)
-            if move:
-                board.apply_move(*move, current_player)
-                board_to_file(board, "AI-2 Move")
-            current_player = 0
-            draw_board(screen, board)
+            result = search.request("AI-2", board, time_limit, True, 1, 0, i, heuristic_func2, ai_depth)
+            if result is not None:
+                if search.last_stats is not None:
+                    set_overlay(stats_lines("AI-2", search.last_stats))
+                _, move, _ = result
+                if move:
+                    play(move, current_player, "AI-2 Move")
+                current_player = 0
+                draw_board(screen, board)
         # Human vs AI
         if game_mode==1 and current_player == 1 and running and(i==1 or not board.is_game_over()):
-            _, move = minimax(board, ai_depth, -math.inf, math.inf, True, 1, 0, i, heuristic_func1)
-            if move:
-                board.apply_move(*move, current_player)
-                board_to_file(board, "AI Move")
-            current_player = 0
-            draw_board(screen, board)
+            result = search.request("AI", board, time_limit, True, 1, 0, i, heuristic_func1, ai_depth)
+            if result is not None:
+                if search.last_stats is not None:
+                    set_overlay(stats_lines("AI", search.last_stats))
+                _, move, _ = result
+                if move:
+                    play(move, current_player, "AI Move")
+                current_player = 0
+                draw_board(screen, board)
+                if ponder and not board.is_game_over():
+                    search.ponder("AI", board, time_limit, True, 1, 0, i + 1, heuristic_func1, ai_depth)
         # Random move vs AI
         if game_mode==3 and current_player == 0 and running and (i==0 or not board.is_game_over()):
             i += 1
             move = random_move(board, 0)
             if move:
-                board.apply_move(*move, current_player)
-                board_to_file(board, "Random Move")
+                play(move, current_player, "Random Move")
             current_player = 1
             draw_board(screen, board)
         if game_mode==3 and current_player == 1 and running and (i==1 or not board.is_game_over()):
-            _, move = minimax(board, ai_depth, -math.inf, math.inf, True, 1, 0, i, heuristic_func1)
-            if move:
-                board.apply_move(*move, current_player)
-                board_to_file(board, "AI Move")
-            current_player = 0
-            draw_board(screen, board)
+            result = search.request("AI", board, time_limit, True, 1, 0, i, heuristic_func1, ai_depth)
+            if result is not None:
+                if search.last_stats is not None:
+                    set_overlay(stats_lines("AI", search.last_stats))
+                _, move, _ = result
+                if move:
+                    play(move, current_player, "AI Move")
+                current_player = 0
+                draw_board(screen, board)
         clock.tick(30)
+    search.close()
+    if record_path:
+        save_game(record_path, history, initial)
     pygame.quit()
     sys.exit()
 
 if __name__ == "__main__":
-    a, b, h1, h2 = menu()
-    main(a, b, h1, h2)
+    a, b, h1, h2, ponder, workers, engine = menu()
+    main(a, b, h1, h2, ponder, show_stats="--stats" in sys.argv[1:], workers=workers, engine=engine)
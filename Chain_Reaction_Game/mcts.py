@@ -0,0 +1,151 @@
+import math
+import random
+import time
+
+from backend import CELLS, CRITICAL_MASS, EMPTY, TOTAL_ORBS
+
+# Monte Carlo tree search (UCT). Each node holds the position after its
+# move and the results of the playouts through it, counted for the player
+# who made that move. The engine keeps its tree between moves: when asked
+# about a position reached from the last root by its own move and a reply,
+# that subtree becomes the new root.
+#
+# A position's ply is its number of orbs (orbs are never lost), which is
+# all the game-over rule needs: after the first two moves, a side with no
+# squares left has lost.
+
+EXPLORATION = 1.4
+PLAYOUT_DEPTH = 4       # heuristic playouts stop here and score the position
+MAX_PLAYOUT = 1000      # random playouts still running after this many moves count as draws
+EXPLOSIVE_PREFERENCE = 0.7
+
+def _ply(board):
+    return board.totals[TOTAL_ORBS] + board.totals[TOTAL_ORBS + 1]
+
+def _winner(board):
+    # 0 or 1 once the game is decided, otherwise None
+    if _ply(board) > 1 and board.is_game_over():
+        return board.get_winner()
+    return None
+
+class MCTSNode:
+    __slots__ = ('board', 'move', 'player', 'parent', 'children', 'untried', 'visits', 'wins', 'winner')
+
+    def __init__(self, board, move, player, parent):
+        self.board = board
+        self.move = move
+        self.player = player        # who made move, i.e. whose wins are counted
+        self.parent = parent
+        self.children = []
+        self.winner = _winner(board)
+        self.untried = board.get_valid_moves(1 - player) if self.winner is None else []
+        self.visits = 0
+        self.wins = 0.0
+
+    def select_child(self, exploration):
+        log_visits = math.log(self.visits)
+        return max(self.children, key=lambda child: child.wins / child.visits
+                   + exploration * math.sqrt(log_visits / child.visits))
+
+    def expand(self, rng):
+        move = self.untried.pop(rng.randrange(len(self.untried)))
+        board = self.board.clone()
+        side = 1 - self.player
+        board.apply_move(*move, side)
+        child = MCTSNode(board, move, side, self)
+        self.children.append(child)
+        return child
+
+class MCTS:
+    # playout: "random" plays random moves to the end of the game;
+    # "heuristic" prefers moves that explode and scores the position with
+    # heuristic_func after PLAYOUT_DEPTH moves. A search stops after
+    # `playouts` playouts or `time_limit` seconds, whichever comes first.
+    def __init__(self, playouts=None, time_limit=1.0, playout="random", heuristic_func=None,
+                 exploration=EXPLORATION, seed=None):
+        if playout not in ("random", "heuristic"):
+            raise ValueError(f"unknown playout type {playout!r}")
+        if playout == "heuristic" and heuristic_func is None:
+            raise ValueError("heuristic playouts need a heuristic_func")
+        self.playouts = playouts
+        self.time_limit = time_limit
+        self.playout = playout
+        self.heuristic_func = heuristic_func
+        self.exploration = exploration
+        self.rng = random.Random(seed)
+        self.root = None
+        self.last_playouts = 0
+        self.reused = 0
+
+    def _set_root(self, board, player):
+        # reuse the subtree for board if it is at most two moves below the old root
+        if self.root is not None:
+            frontier = [self.root]
+            for _ in range(2):
+                frontier = [child for node in frontier for child in node.children]
+                for node in frontier:
+                    if node.board.key == board.key and node.player == 1 - player:
+                        node.parent = None
+                        self.root = node
+                        self.reused = node.visits
+                        return
+        self.root = MCTSNode(board.clone(), None, 1 - player, None)
+        self.reused = 0
+
+    def search(self, board, player, should_stop=None):
+        # returns (move, win rate for player, playouts this search)
+        self._set_root(board, player)
+        root = self.root
+        deadline = time.perf_counter() + self.time_limit if self.time_limit is not None else None
+        done = 0
+        while (self.playouts is None or done < self.playouts) and (deadline is None or done == 0
+                                                                   or time.perf_counter() < deadline):
+            if should_stop is not None and done % 64 == 0 and should_stop():
+                break
+            node = root
+            while not node.untried and node.children:
+                node = node.select_child(self.exploration)
+            if node.untried:
+                node = node.expand(self.rng)
+            result = self._playout(node)
+            while node is not None:
+                node.visits += 1
+                node.wins += result if node.player == 0 else 1 - result
+                node = node.parent
+            done += 1
+        self.last_playouts = done
+        if not root.children:
+            return None, 0.0, done
+        best = max(root.children, key=lambda child: child.visits)
+        return best.move, best.wins / best.visits, done
+
+    def _playout(self, node):
+        # player 0's score: 1 win, 0 loss, 0.5 undecided
+        if node.winner is not None:
+            return 1.0 if node.winner == 0 else 0.0
+        board = node.board.clone()
+        side = 1 - node.player
+        rng = self.rng
+        heuristic = self.playout == "heuristic"
+        plies = 0
+        while True:
+            moves = [i for i in range(CELLS) if board.owners[i] == EMPTY or board.owners[i] == side]
+            if heuristic and rng.random() < EXPLOSIVE_PREFERENCE:
+                explosive = [i for i in moves if board.counts[i] >= CRITICAL_MASS[i]]
+                if explosive:
+                    moves = explosive
+            i = rng.choice(moves)
+            board.apply_move(i // board.cols, i % board.cols, side)
+            winner = _winner(board)
+            if winner is not None:
+                return 1.0 if winner == 0 else 0.0
+            side = 1 - side
+            plies += 1
+            if heuristic and plies >= PLAYOUT_DEPTH:
+                value = self.heuristic_func(board, 0, 1)
+                return 1.0 if value > 0 else 0.0 if value < 0 else 0.5
+            if plies >= MAX_PLAYOUT:
+                return 0.5
+
+    def choose_move(self, board, player):
+        return self.search(board, player)[0]
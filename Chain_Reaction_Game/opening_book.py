@@ -0,0 +1,207 @@
+import argparse
+import math
+import mmap
+import multiprocessing
+import os
+import struct
+
+from backend import (CELLS, COLS, HEURISTICS, ROWS, ZOBRIST_COUNT, ZOBRIST_OWNER, Board, MoveOrdering,
+                     TranspositionTable, minimax)
+
+# Opening book: best moves for early positions, found offline by deep
+# searches and looked up before searching during play.
+#
+# Positions are keyed by a canonical Zobrist key: the smallest key among
+# the board and its mirror images (left-right, top-bottom and both), so
+# symmetric positions share an entry and moves are stored in the frame of
+# the canonical image. A move depends on the heuristic and on what the
+# search optimizes, so each entry also records the heuristic number and
+# minimax's player/maximizing arguments. A position can have one entry per
+# search depth, so an AI gets the deepest move it could have found itself.
+#
+# File format: header b"CRBK", uint16 version, uint32 entry count, then
+# entries sorted by (key, flags, depth), each
+#   uint64 canonical key, uint8 flags (heuristic | player << 3 | maximizing << 4),
+#   uint8 square, uint8 search depth, pad byte, float32 value.
+
+BOOK_MAGIC = b"CRBK"
+BOOK_VERSION = 2
+_BOOK_HEADER = struct.Struct("<4sHxxI")
+_BOOK_ENTRY = struct.Struct("<QBBBxf")
+DEFAULT_BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "opening_book.bin")
+
+# SYMMETRIES[t][i]: where square i goes under mirror image t; each is its own inverse
+SYMMETRIES = [
+    [(r if not flip_rows else ROWS - 1 - r) * COLS + (c if not flip_cols else COLS - 1 - c)
+     for r in range(ROWS) for c in range(COLS)]
+    for flip_rows in (False, True) for flip_cols in (False, True)
+]
+
+HEURISTIC_IDS = {func: number for number, func in HEURISTICS.items()}
+
+# (player, maximizing) as passed to minimax by the frontend's AIs and the
+# tournament: AI-1 moving first, AI / AI-2 moving second, either side in
+# the tournament
+BOOK_ROLES = [(1, False), (1, True), (0, True)]
+
+def canonical(board):
+    # (canonical key, symmetry mapping the board onto its canonical image)
+    best_key, best_t = None, 0
+    counts, owners = board.counts, board.owners
+    for t, perm in enumerate(SYMMETRIES):
+        key = 0
+        for i in range(CELLS):
+            if counts[i]:
+                j = perm[i]
+                key ^= ZOBRIST_COUNT[(j << 4) | (counts[i] & 15)] ^ ZOBRIST_OWNER[(j << 8) | owners[i]]
+        if best_key is None or key < best_key:
+            best_key, best_t = key, t
+    return best_key, best_t
+
+def book_flags(heuristic, player, maximizing):
+    return heuristic | player << 3 | maximizing << 4
+
+
+class OpeningBook:
+    def __init__(self, path=DEFAULT_BOOK_PATH):
+        self.path = path
+        self._file = self._map = self._entries = None
+        self.size = 0
+        if os.path.exists(path) and os.path.getsize(path) >= _BOOK_HEADER.size:
+            self._file = open(path, "rb")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, self.size = _BOOK_HEADER.unpack_from(self._map)
+            if magic != BOOK_MAGIC or version != BOOK_VERSION:
+                raise ValueError(f"{path} is not a version {BOOK_VERSION} opening book")
+            self._entries = memoryview(self._map)[_BOOK_HEADER.size:_BOOK_HEADER.size + self.size * _BOOK_ENTRY.size]
+
+    def __len__(self):
+        return self.size
+
+    def _find(self, key, flags, max_depth=None):
+        # the deepest entry for (key, flags) searched no deeper than max_depth
+        lo, hi = 0, self.size
+        target = (key, flags)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            entry = _BOOK_ENTRY.unpack_from(self._entries, mid * _BOOK_ENTRY.size)
+            if entry[:2] < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        found = None
+        while lo < self.size:
+            entry = _BOOK_ENTRY.unpack_from(self._entries, lo * _BOOK_ENTRY.size)
+            if entry[:2] != target or (max_depth is not None and entry[3] > max_depth):
+                break
+            found = entry
+            lo += 1
+        return found
+
+    def lookup(self, board, maximizing, player, opponent, heuristic_func, max_depth=None):
+        # (value, move, depth) from the book, or None. With max_depth, entries
+        # searched deeper than that are ignored, so a shallow AI stays shallow
+        # and plays the deepest move it is allowed.
+        heuristic = HEURISTIC_IDS.get(heuristic_func)
+        if not self.size or heuristic is None:
+            return None
+        key, t = canonical(board)
+        entry = self._find(key, book_flags(heuristic, player, maximizing), max_depth)
+        if entry is None:
+            return None
+        square = SYMMETRIES[t][entry[2]]
+        move = (square // COLS, square % COLS)
+        if not board.is_valid_move(*move, player if maximizing else opponent):
+            return None
+        return entry[4], move, entry[3]
+
+    def close(self):
+        if self._map is not None:
+            self._entries.release()
+            self._map.close()
+            self._file.close()
+            self._map = self._entries = None
+            self.size = 0
+
+_default_book = None
+
+def book_move(board, maximizing, player, opponent, heuristic_func, max_depth=None):
+    # lookup in DEFAULT_BOOK_PATH, mapped on first use
+    global _default_book
+    if _default_book is None:
+        _default_book = OpeningBook()
+    return _default_book.lookup(board, maximizing, player, opponent, heuristic_func, max_depth)
+
+
+def _book_search(job):
+    key, board, ply, heuristic, player, maximizing, depth = job
+    value, move = minimax(board, depth, -math.inf, math.inf, maximizing, player, 1 - player, ply // 2 + 1,
+                          HEURISTICS[heuristic], TranspositionTable(16), None, None, MoveOrdering())
+    return key, board, ply, heuristic, player, maximizing, depth, value, move
+
+BOOK_DEPTHS = (2, 3, 4, 5)
+
+def build_book(path=DEFAULT_BOOK_PATH, heuristics=(1, 2, 3, 4, 5), roles=BOOK_ROLES, book_moves=2,
+               depths=BOOK_DEPTHS, workers=None, progress=True):
+    # Self-play from the empty board for every search depth, heuristic and
+    # role: where the role's side is to move, store the searched move and
+    # follow it; where the other side is to move, follow every reply. Stops
+    # after the role's side has made book_moves moves.
+    entries = {}
+    with multiprocessing.Pool(workers or os.cpu_count() or 1) as pool:
+        for depth in depths:
+            for heuristic in heuristics:
+                for player, maximizing in roles:
+                    side = player if maximizing else 1 - player
+                    flags = book_flags(heuristic, player, maximizing)
+                    last_ply = side + 2 * (book_moves - 1)
+                    frontier = {canonical(Board())[0]: Board()}
+                    for ply in range(last_ply + 1):
+                        if ply % 2 == side:
+                            jobs = [(key, board, ply, heuristic, player, maximizing, depth)
+                                    for key, board in frontier.items()]
+                            frontier = {}
+                            for key, board, _, _, _, _, _, value, move in pool.imap_unordered(_book_search, jobs, 4):
+                                if move is None:
+                                    continue
+                                canon_key, t = canonical(board)
+                                entries[(canon_key, flags, depth)] = (SYMMETRIES[t][move[0] * COLS + move[1]], value)
+                                board = board.clone()
+                                board.apply_move(*move, side)
+                                frontier.setdefault(canonical(board)[0], board)
+                        else:
+                            replies = {}
+                            for board in frontier.values():
+                                if ply > 1 and board.is_game_over():
+                                    continue
+                                for move in board.get_valid_moves(1 - side):
+                                    child = board.clone()
+                                    child.apply_move(*move, 1 - side)
+                                    replies.setdefault(canonical(child)[0], child)
+                            frontier = replies
+                        if progress:
+                            print(f"depth {depth} heuristic {heuristic} role {player},{maximizing}: ply {ply}, "
+                                  f"{len(entries)} entries", flush=True)
+    write_book(path, entries)
+    return len(entries)
+
+def write_book(path, entries):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(_BOOK_HEADER.pack(BOOK_MAGIC, BOOK_VERSION, len(entries)))
+        for (key, flags, depth), (square, value) in sorted(entries.items()):
+            f.write(_BOOK_ENTRY.pack(key, flags, square, depth, value))
+    os.replace(tmp, path)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the Chain Reaction opening book by self-play")
+    parser.add_argument("path", nargs="?", default=DEFAULT_BOOK_PATH)
+    parser.add_argument("--heuristics", type=lambda text: [int(x) for x in text.split(",") if x],
+                        default=sorted(HEURISTICS))
+    parser.add_argument("--book-moves", type=int, default=2, help="book moves per side")
+    parser.add_argument("--depths", type=lambda text: [int(x) for x in text.split(",") if x],
+                        default=list(BOOK_DEPTHS), help="search depths to store book moves for")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    args = parser.parse_args()
+    count = build_book(args.path, args.heuristics, BOOK_ROLES, args.book_moves, args.depths, args.workers)
+    print(f"wrote {count} entries to {args.path}")
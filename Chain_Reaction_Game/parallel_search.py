@@ -0,0 +1,195 @@
+import argparse
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from backend import (HEURISTICS, MAX_SEARCH_DEPTH, PVS_EPSILON, MoveOrdering, SearchStats, SearchTimeout,
+                     TranspositionTable, cancellable, minimax)
+
+# Root-splitting search on a process pool. The best-ordered root move is
+# searched first on its own to get a bound; the other root moves are then
+# searched in parallel, each with a null window just below the best value
+# found so far and again with a full window only if it equals or beats it,
+# so ties come back exact and go to the best-ordered move, as in the serial
+# search, whatever order the workers finish in. That value lives
+# in shared memory and every subtree reads it when a worker picks it up, so
+# subtrees started later are pruned by what earlier ones found.
+# Each worker process keeps its own transposition table and move ordering.
+
+_best = None        # best root value so far, negated when the root minimizes
+_generation = None
+_tables = {}
+
+def _init_worker(best, generation):
+    global _best, _generation
+    _best = best
+    _generation = generation
+
+def _subtree_job(generation, board, move, depth, maximizing, player, opponent, no_moves, heuristic_func,
+                 deadline, with_stats):
+    # returns (move, value, exact, stats dict), or None if cancelled or out of time
+    if _generation.value != generation:
+        return None
+    tt, ordering = _tables.setdefault((heuristic_func.__name__, player), (TranspositionTable(), MoveOrdering()))
+    tt.new_search()
+    heuristic = cancellable(heuristic_func, _generation, generation)
+    stats = SearchStats() if with_stats else None
+    sign = 1 if maximizing else -1
+    child = board.clone()
+    child.apply_move(*move, player if maximizing else opponent)
+    bound = sign * _best.value
+    try:
+        if bound != -math.inf and bound != math.inf:
+            if maximizing:
+                alpha, beta = bound - PVS_EPSILON, bound
+            else:
+                alpha, beta = bound, bound + PVS_EPSILON
+            value, _ = minimax(child, depth - 1, alpha, beta, not maximizing, player, opponent, no_moves,
+                               heuristic, tt, deadline, stats, ordering)
+            if sign * value <= sign * bound - PVS_EPSILON:
+                return move, value, False, stats.as_dict() if stats else None
+            alpha, beta = (bound - PVS_EPSILON, math.inf) if maximizing else (-math.inf, bound + PVS_EPSILON)
+        else:
+            alpha, beta = -math.inf, math.inf
+        value, _ = minimax(child, depth - 1, alpha, beta, not maximizing, player, opponent, no_moves,
+                           heuristic, tt, deadline, stats, ordering)
+    except SearchTimeout:
+        return None
+    with _best.get_lock():
+        if sign * value > _best.value:
+            _best.value = sign * value
+    return move, value, True, stats.as_dict() if stats else None
+
+
+class ParallelSearch:
+    # search() and iterative_deepening() mirror the serial functions in
+    # backend and return the same values. Pass a shared generation counter
+    # (a multiprocessing RawValue) to cancel searches from another thread by
+    # incrementing it.
+    def __init__(self, workers=None, generation=None):
+        self.workers = workers or os.cpu_count() or 1
+        self._best = multiprocessing.Value('d', -math.inf)
+        self._generation = generation if generation is not None else multiprocessing.RawValue('i', 0)
+        self._executor = ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                             initargs=(self._best, self._generation))
+        self.ordering = MoveOrdering(pvs=False)
+        self.stats = None
+
+    def search(self, board, depth, maximizing, player, opponent, no_moves, heuristic_func, deadline=None,
+               first_move=None, with_stats=False):
+        # returns (value, move); raises SearchTimeout past the deadline or when cancelled
+        side = player if maximizing else opponent
+        moves = board.get_valid_moves(side)
+        if depth <= 1 or not moves or (no_moves > 1 and board.is_game_over()):
+            return minimax(board, depth, -math.inf, math.inf, maximizing, player, opponent, no_moves,
+                           heuristic_func, None, deadline)
+        self.ordering.order(board, moves, side, depth)
+        if first_move in moves:
+            moves.remove(first_move)
+            moves.insert(0, first_move)
+        sign = 1 if maximizing else -1
+        generation = self._generation.value
+        self._best.value = -math.inf
+        job = (depth, maximizing, player, opponent, no_moves, heuristic_func, deadline, with_stats)
+        first = self._executor.submit(_subtree_job, generation, board, moves[0], *job).result()
+        if first is None:
+            raise SearchTimeout()
+        results = [first]
+        futures = [self._executor.submit(_subtree_job, generation, board, move, *job) for move in moves[1:]]
+        for future in as_completed(futures):
+            result = future.result()
+            if result is None:
+                for other in futures:
+                    other.cancel()
+                raise SearchTimeout()
+            results.append(result)
+        rank = {move: n for n, move in enumerate(moves)}
+        best_move, best_value = None, None
+        for move, value, exact, _ in results:
+            if not exact:
+                continue
+            if best_move is None or sign * value > sign * best_value or (
+                    value == best_value and rank[move] < rank[best_move]):
+                best_move, best_value = move, value
+        if with_stats:
+            self.stats = _merge_stats(result[3] for result in results)
+        self.ordering.cutoff(best_move, side, depth)
+        return best_value, best_move
+
+    def iterative_deepening(self, board, time_limit, maximizing, player, opponent, no_moves, heuristic_func,
+                            max_depth=MAX_SEARCH_DEPTH, with_stats=False):
+        # returns (value, move, depth) like backend.iterative_deepening
+        start = time.perf_counter()
+        deadline = start + time_limit
+        value, move = minimax(board, 1, -math.inf, math.inf, maximizing, player, opponent, no_moves,
+                              heuristic_func)
+        completed = 1
+        stats = []
+        for depth in range(2, max_depth + 1):
+            if move is None:
+                break
+            try:
+                value, move = self.search(board, depth, maximizing, player, opponent, no_moves, heuristic_func,
+                                          deadline, move, with_stats)
+            except SearchTimeout:
+                break
+            completed = depth
+            if with_stats:
+                stats.append(self.stats)
+        if with_stats:
+            merged = _merge_stats(stats)
+            merged["depth"] = completed
+            merged["search_time"] = time.perf_counter() - start
+            merged["nodes_per_sec"] = round(merged["nodes"] / merged["search_time"]) if merged["search_time"] else 0
+            merged["workers"] = self.workers
+            self.stats = merged
+        return value, move, completed
+
+    def close(self):
+        self._generation.value += 1
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+def _merge_stats(dicts):
+    merged = SearchStats().as_dict()
+    for stats in dicts:
+        if stats:
+            for name in ("nodes", "leaves", "expanded", "cutoffs", "tt_cutoffs", "researches"):
+                merged[name] += stats[name]
+    return merged
+
+def measure_speedup(depth, workers=None, heuristic=4, positions=None):
+    # Serial search (TT, move ordering and PVS) against the parallel search
+    # at a fixed depth on the benchmark positions: (serial s, parallel s, speedup).
+    from search_bench import BENCH_POSITIONS, bench_position
+    boards = [bench_position(seed, plies) for seed, plies in positions or BENCH_POSITIONS]
+    heuristic_func = HEURISTICS[heuristic]
+    start = time.perf_counter()
+    serial = []
+    for board, player, no_moves in boards:
+        serial.append(minimax(board, depth, -math.inf, math.inf, True, player, 1 - player, no_moves,
+                              heuristic_func, TranspositionTable(), None, None, MoveOrdering())[0])
+    serial_time = time.perf_counter() - start
+    search = ParallelSearch(workers)
+    try:
+        start = time.perf_counter()
+        parallel = [search.search(board, depth, True, player, 1 - player, no_moves, heuristic_func)[0]
+                    for board, player, no_moves in boards]
+        parallel_time = time.perf_counter() - start
+    finally:
+        search.close()
+    if any(abs(a - b) > 1e-9 for a, b in zip(serial, parallel)):
+        raise AssertionError("parallel search values differ from the serial search")
+    return serial_time, parallel_time, serial_time / parallel_time
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Speedup of the parallel root search over the serial search")
+    parser.add_argument("--depths", type=lambda text: [int(x) for x in text.split(",") if x], default=[4, 5])
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--heuristic", type=int, default=4)
+    args = parser.parse_args()
+    for depth in args.depths:
+        serial_time, parallel_time, speedup = measure_speedup(depth, args.workers, args.heuristic)
+        print(f"depth {depth}: serial {serial_time:.2f}s  parallel {parallel_time:.2f}s  "
+              f"speedup {speedup:.2f}x with {args.workers or os.cpu_count()} workers")
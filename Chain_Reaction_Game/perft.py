@@ -0,0 +1,209 @@
+import argparse
+import json
+import math
+import os
+import platform
+import time
+
+import backend
+from backend import (HEURISTICS, TOTAL_ORBS, MoveOrdering, SearchStats, TranspositionTable, board_from_text,
+                     minimax)
+
+# Headless speed and correctness suite for the engine. perft(board, depth)
+# plays every legal move to the given depth and counts the positions
+# reached, with a checksum of their Zobrist keys: both are fixed by the
+# rules alone, so a change to move generation or chain resolution that
+# alters any result shows up as a mismatch with PERFT_EXPECTED. The same
+# runs give moves and explosions per second; add to that the cost of
+# clone, get_valid_moves and apply_move on their own and a fixed-depth
+# search with each heuristic.
+
+# Positions in the gamestate.txt format. "AI Move:" means player 0 (red)
+# is to move, "Human Move:" player 1 (blue).
+PERFT_POSITIONS = {
+    "empty": """AI Move:
+0 0 0 0 0 0
+0 0 0 0 0 0
+0 0 0 0 0 0
+0 0 0 0 0 0
+0 0 0 0 0 0
+0 0 0 0 0 0
+0 0 0 0 0 0
+0 0 0 0 0 0
+0 0 0 0 0 0
+""",
+    "opening": """AI Move:
+0 0 0 0 0 0
+0 0 0 0 0 0
+0 0 0 0 0 0
+0 0 0 0 0 0
+0 0 0 0 1R 0
+1B 0 0 0 0 0
+1B 0 0 0 0 0
+0 0 0 0 0 0
+0 0 1R 0 0 0
+""",
+    "middle": """AI Move:
+0 1R 0 0 0 1B
+1R 1R 0 1R 0 0
+2B 0 1R 0 0 2B
+0 0 0 0 1B 0
+1R 1R 1B 1B 0 1B
+1R 1R 0 0 1B 0
+2B 0 1R 0 0 1B
+0 1B 0 2R 1R 0
+0 0 1B 2R 0 0
+""",
+    # 16 squares one orb from exploding
+    "cascade": """AI Move:
+1B 2B 1R 0 0 1B
+1R 1B 1R 0 1R 2B
+2B 1R 0 3R 2R 1B
+2B 1R 3R 1B 1B 0
+2R 3R 0 1B 1R 2B
+1B 1B 1B 1R 0 2R
+2R 1B 0 1B 1R 1R
+1B 1B 1B 1B 1R 0
+1B 1R 2B 0 1B 1R
+""",
+}
+
+# PERFT_EXPECTED[name][depth - 1]: (positions, checksum), as given by the
+# original full-board-rescan chain resolution
+PERFT_EXPECTED = {
+    "empty": [(54, "e23ed2195b8c6c53"), (2862, "8165cd39868b3b96"), (151686, "14e2562a2befa744")],
+    "opening": [(52, "6c7b29e26d3fc1f9"), (2654, "263b2142097edf3a"), (135458, "d7f9510ef6fa1f88")],
+    "middle": [(42, "db0096ae3136b237"), (1692, "149cbfac27226528"), (69617, "fdcb64d1d5fbdd79")],
+    "cascade": [(30, "2c4c9471ecd89031"), (994, "6830b2aec1dbf463"), (29451, "cc18cd6224a8e71a")],
+}
+
+CHECKSUM_MASK = (1 << 64) - 1
+
+def perft(board, depth, side, counters=None):
+    # Number of positions after depth moves from board with side to move.
+    # A decided game counts as one position and is not played on. counters,
+    # if given, is [moves played, explosions, checksum] and is added to.
+    if depth == 0 or (board.totals[TOTAL_ORBS] + board.totals[TOTAL_ORBS + 1] > 1 and board.is_game_over()):
+        if counters is not None:
+            counters[2] = (counters[2] + board.key) & CHECKSUM_MASK
+        return 1
+    positions = 0
+    for move in board.get_valid_moves(side):
+        child = board.clone()
+        explosions = child.apply_move(*move, side)
+        if counters is not None:
+            counters[0] += 1
+            counters[1] += explosions
+        positions += perft(child, depth - 1, 1 - side, counters)
+    return positions
+
+def run_perft(board, side, max_depth):
+    rows = []
+    for depth in range(1, max_depth + 1):
+        counters = [0, 0, 0]
+        start = time.perf_counter()
+        positions = perft(board, depth, side, counters)
+        seconds = time.perf_counter() - start
+        rows.append({"depth": depth, "positions": positions, "checksum": f"{counters[2]:016x}",
+                     "moves": counters[0], "explosions": counters[1], "seconds": round(seconds, 4),
+                     "moves_per_sec": round(counters[0] / seconds) if seconds else 0,
+                     "explosions_per_sec": round(counters[1] / seconds) if seconds else 0})
+    return rows
+
+def time_ops(board, side, repeat=200):
+    # microseconds per call of clone, get_valid_moves and apply_move (each legal move in turn)
+    moves = board.get_valid_moves(side)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        board.clone()
+    clone_time = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(repeat):
+        board.get_valid_moves(side)
+    moves_time = time.perf_counter() - start
+    rounds = max(1, repeat // len(moves)) if moves else 0
+    apply_time = 0.0
+    for _ in range(rounds):
+        boards = [board.clone() for _ in moves]
+        start = time.perf_counter()
+        for child, move in zip(boards, moves):
+            child.apply_move(*move, side)
+        apply_time += time.perf_counter() - start
+    return {"clone_us": round(clone_time / repeat * 1e6, 3),
+            "get_valid_moves_us": round(moves_time / repeat * 1e6, 3),
+            "apply_move_us": round(apply_time / (rounds * len(moves)) * 1e6, 3) if rounds else None}
+
+def run_searches(board, side, depth, heuristics):
+    # fixed-depth minimax with the transposition table, move ordering and PVS
+    plies = board.totals[TOTAL_ORBS] + board.totals[TOTAL_ORBS + 1]
+    rows = []
+    for heuristic in heuristics:
+        stats = SearchStats()
+        start = time.perf_counter()
+        value, move = minimax(board, depth, -math.inf, math.inf, True, side, 1 - side, plies // 2 + 1,
+                              HEURISTICS[heuristic], TranspositionTable(16), None, stats, MoveOrdering())
+        seconds = time.perf_counter() - start
+        rows.append({"heuristic": heuristic, "depth": depth, "seconds": round(seconds, 4), "nodes": stats.nodes,
+                     "nodes_per_sec": round(stats.nodes / seconds) if seconds else 0, "value": value,
+                     "move": list(move) if move else None})
+    return rows
+
+def run_suite(perft_depth=3, search_depth=4, positions=PERFT_POSITIONS, heuristics=sorted(HEURISTICS),
+              progress=True):
+    # results for every position, and the perft results that differ from PERFT_EXPECTED
+    results = []
+    mismatches = []
+    for name, text in positions.items():
+        board, side = board_from_text(text)
+        result = {"name": name, "to_move": side, "perft": run_perft(board, side, perft_depth),
+                  "ops": time_ops(board, side), "search": run_searches(board, side, search_depth, heuristics)}
+        expected = PERFT_EXPECTED.get(name, [])
+        for row in result["perft"]:
+            if row["depth"] <= len(expected):
+                want_positions, want_checksum = expected[row["depth"] - 1]
+                row["expected"] = row["positions"] == want_positions and row["checksum"] == want_checksum
+                if not row["expected"]:
+                    mismatches.append(f"{name} depth {row['depth']}: {row['positions']} positions "
+                                      f"{row['checksum']}, expected {want_positions} {want_checksum}")
+        results.append(result)
+        if progress:
+            for row in result["perft"]:
+                print(f"{name:>8} perft {row['depth']}: {row['positions']:>9} positions {row['checksum']}  "
+                      f"{row['moves_per_sec']:>8} moves/s {row['explosions_per_sec']:>8} explosions/s"
+                      + ("  MISMATCH" if row.get("expected") is False else ""))
+            ops = result["ops"]
+            print(f"{name:>8} clone {ops['clone_us']}us  get_valid_moves {ops['get_valid_moves_us']}us  "
+                  f"apply_move {ops['apply_move_us']}us")
+            for row in result["search"]:
+                print(f"{name:>8} heuristic {row['heuristic']} depth {row['depth']}: {row['seconds']:.3f}s "
+                      f"{row['nodes']} nodes")
+    return results, mismatches
+
+def _int_list(text):
+    return [int(x) for x in text.split(",") if x]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Perft counts and engine speed on fixed positions")
+    parser.add_argument("--perft-depth", type=int, default=3)
+    parser.add_argument("--search-depth", type=int, default=4)
+    parser.add_argument("--heuristics", type=_int_list, default=sorted(HEURISTICS))
+    parser.add_argument("--position", action="append", default=[],
+                        help="extra position in gamestate.txt format (repeatable)")
+    parser.add_argument("--json", default=None, help="write the results here ('-' for stdout)")
+    args = parser.parse_args()
+    positions = dict(PERFT_POSITIONS)
+    for path in args.position:
+        with open(path) as f:
+            positions[os.path.basename(path)] = f.read()
+    results, mismatches = run_suite(args.perft_depth, args.search_depth, positions, args.heuristics,
+                                    progress=args.json != "-")
+    report = {"python": platform.python_version(), "numpy": backend.np is not None,
+              "perft_depth": args.perft_depth, "search_depth": args.search_depth, "positions": results,
+              "mismatches": mismatches}
+    if args.json == "-":
+        print(json.dumps(report, indent=1))
+    elif args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=1)
+    if mismatches:
+        raise SystemExit("perft mismatch:\n" + "\n".join(mismatches))
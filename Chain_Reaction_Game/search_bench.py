@@ -0,0 +1,98 @@
+import argparse
+import json
+import math
+import random
+import time
+
+from backend import (HEURISTICS, Board, MoveOrdering, SearchStats, SearchTimeout, TranspositionTable,
+                     minimax)
+
+# Node counts of a fixed-depth search from fixed positions, with each search
+# enhancement switched on in turn. Every configuration must agree on the
+# root value; only the work done to find it may differ. Nodes are split
+# into leaves (heuristic evaluations, batched or not) and interior nodes,
+# counted the same way in every configuration.
+
+# (seed, plies): the position after that many random moves from that seed
+BENCH_POSITIONS = [(1, 6), (2, 12), (3, 20), (4, 28), (5, 36), (6, 44)]
+
+CONFIGS = [
+    ("plain", False, None),
+    ("tt", True, None),
+    ("tt+order", True, False),
+    ("tt+order+pvs", True, True),
+]
+
+def bench_position(seed, plies):
+    rng = random.Random(seed)
+    board = Board()
+    player = 0
+    for ply in range(plies):
+        if ply > 1 and board.is_game_over():
+            break
+        board.apply_move(*rng.choice(board.get_valid_moves(player)), player)
+        player = 1 - player
+    # the side to move searches as the maximizing player
+    return board, player, ply // 2 + 1
+
+def run_bench(depths, heuristic=4, positions=BENCH_POSITIONS, time_budget=60.0, progress=True):
+    heuristic_func = HEURISTICS[heuristic]
+    boards = [bench_position(seed, plies) for seed, plies in positions]
+    rows = []
+    for depth in depths:
+        for name, use_tt, pvs in CONFIGS:
+            stats = SearchStats()
+            values = []
+            start = time.perf_counter()
+            try:
+                for board, player, no_moves in boards:
+                    tt = TranspositionTable(16) if use_tt else None
+                    ordering = MoveOrdering(pvs) if pvs is not None else None
+                    value, _ = minimax(board, depth, -math.inf, math.inf, True, player, 1 - player, no_moves,
+                                       heuristic_func, tt, start + time_budget, stats, ordering)
+                    values.append(value)
+            except SearchTimeout:
+                values = None
+            seconds = time.perf_counter() - start
+            rows.append({"depth": depth, "config": name, "nodes": stats.nodes if values else None,
+                         "leaves": stats.leaves if values else None,
+                         "interior": stats.nodes - stats.leaves if values else None,
+                         "seconds": round(seconds, 3), "values": values})
+            if progress:
+                print(f"depth {depth} {name:>13}: " +
+                      (f"{stats.nodes:>10} nodes ({stats.leaves} leaves, {stats.nodes - stats.leaves} interior)"
+                       f" {seconds:8.2f}s" if values else f"over {time_budget:.0f}s"))
+        results = [row for row in rows if row["depth"] == depth and row["values"]]
+        for row in results[1:]:
+            if any(abs(a - b) > 1e-9 for a, b in zip(row["values"], results[0]["values"])):
+                raise AssertionError(f"{row['config']} disagrees with {results[0]['config']} at depth {depth}")
+    for row in rows:
+        base = next((r for r in rows if r["depth"] == row["depth"] and r["nodes"]), None)
+        for count, ratio in (("nodes", "node_ratio"), ("leaves", "leaf_ratio"), ("interior", "interior_ratio")):
+            row[ratio] = round(row[count] / base[count], 4) if row[count] is not None and base and base[count] else None
+    return rows
+
+def _int_list(text):
+    return [int(x) for x in text.split(",") if x]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Node counts of minimax with and without move ordering and PVS")
+    parser.add_argument("--depths", type=_int_list, default=[3, 4, 5, 6])
+    parser.add_argument("--heuristic", type=int, default=4)
+    parser.add_argument("--time-budget", type=float, default=60.0,
+                        help="seconds per configuration and depth before giving up on it")
+    parser.add_argument("--json", default=None)
+    args = parser.parse_args()
+    rows = run_bench(args.depths, args.heuristic, time_budget=args.time_budget)
+    print()
+    # ratios to plain: all nodes / leaves / interior nodes
+    for depth in args.depths:
+        line = [f"depth {depth}:"]
+        for row in rows:
+            if row["depth"] == depth:
+                line.append(f"{row['config']} {row['node_ratio']:.3f}/{row['leaf_ratio']:.3f}/"
+                            f"{row['interior_ratio']:.3f}" if row["node_ratio"] else f"{row['config']} -")
+        print("  ".join(line))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"heuristic": args.heuristic, "positions": BENCH_POSITIONS, "results": rows}, f, indent=1)
@@ -0,0 +1,46 @@
+import math
+
+import pytest
+
+import backend
+from backend import HEURISTICS, MoveOrdering, SearchStats, TranspositionTable, evaluate_children, minimax
+from search_bench import bench_position
+
+pytest.importorskip("numpy")
+
+POSITIONS = [(seed, plies) for seed in range(1, 9) for plies in (2, 9, 20, 33, 46)]
+
+def _search(board, depth, maximizing, player, no_moves, heuristic_func, ordered):
+    stats = SearchStats()
+    tt, ordering = (TranspositionTable(16), MoveOrdering()) if ordered else (None, None)
+    value, move = minimax(board, depth, -math.inf, math.inf, maximizing, player, 1 - player, no_moves,
+                          heuristic_func, tt, None, stats, ordering)
+    return value, move, stats.nodes, stats.leaves, stats.cutoffs
+
+def test_children_values_match_heuristics():
+    for seed, plies in POSITIONS:
+        board, player, _ = bench_position(seed, plies)
+        for side in (0, 1):
+            moves = board.get_valid_moves(side)
+            for heuristic_func in HEURISTICS.values():
+                values = evaluate_children(board, moves, side, heuristic_func, player, 1 - player)
+                for move, value in zip(moves, values):
+                    child = board.clone()
+                    child.apply_move(*move, side)
+                    if value is not None:
+                        assert value == heuristic_func(child, player, 1 - player)
+
+@pytest.mark.parametrize("ordered", [False, True])
+@pytest.mark.parametrize("heuristic", sorted(HEURISTICS))
+def test_batched_search_chooses_serial_moves(monkeypatch, heuristic, ordered):
+    # same value, same move and the same amount of work as the per-child search
+    for seed, plies in POSITIONS:
+        board, player, no_moves = bench_position(seed, plies)
+        for depth in (1, 2, 3):
+            for maximizing in (True, False):
+                args = (board, depth, maximizing, player, no_moves, HEURISTICS[heuristic], ordered)
+                batched = _search(*args)
+                with monkeypatch.context() as patch:
+                    patch.setattr(backend, "np", None)
+                    serial = _search(*args)
+                assert batched == serial, (seed, plies, depth, maximizing)
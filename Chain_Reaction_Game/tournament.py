@@ -0,0 +1,249 @@
+import argparse
+import csv
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import random
+import time
+
+from backend import (HEURISTICS, Board, MoveOrdering, SearchStats, TranspositionTable, iterative_deepening,
+                     minimax)
+from opening_book import OpeningBook
+
+# Headless round-robin between (heuristic, depth) configurations. Every
+# pairing plays games in colour-swapped pairs from the same random opening,
+# so neither side profits from moving first or from a lucky opening.
+
+HEURISTIC_NAMES = {1: "simple", 2: "cell_control", 3: "edge_priority", 4: "critical_mass", 5: "aggressive"}
+OPENING_PLIES = 4
+MAX_PLIES = 400  # a game still running after this many moves is scored as a draw
+ELO_BASE = 1500
+
+STANDINGS_HEADER = ["config", "heuristic", "depth", "games", "wins", "losses", "draws", "win_rate",
+                    "elo", "avg_length", "nodes", "search_seconds", "nodes_per_sec"]
+
+def config_name(config):
+    heuristic, depth = config
+    return f"{HEURISTIC_NAMES.get(heuristic, heuristic)}@{depth}"
+
+_books = {}
+
+def play_game(first, second, seed, opening_plies=OPENING_PLIES, max_plies=MAX_PLIES, time_limit=None,
+              move_stats=None, book_path=None):
+    # first plays player 0 (who moves first), second plays player 1.
+    # Returns (winner, plies, nodes, search_seconds) with winner 0, 1 or
+    # None for a draw and nodes/seconds per player. If move_stats is a
+    # list, every search is timed and its stats dict is appended to it.
+    # With book_path, both sides play opening book moves where it has one
+    # searched no deeper than their own depth.
+    book = _books.setdefault(book_path, OpeningBook(book_path)) if book_path else None
+    rng = random.Random(seed)
+    configs = (first, second)
+    heuristics = [HEURISTICS[heuristic] for heuristic, _ in configs]
+    tables = (TranspositionTable(16), TranspositionTable(16))
+    orderings = (MoveOrdering(), MoveOrdering())
+    nodes = [0, 0]
+    seconds = [0.0, 0.0]
+    board = Board()
+    ply = 0
+    while ply < max_plies:
+        if ply > 1 and board.is_game_over():
+            return board.get_winner(), ply, nodes, seconds
+        player = ply % 2
+        if ply < opening_plies:
+            move = rng.choice(board.get_valid_moves(player))
+        else:
+            # same no_moves convention as the frontend: full moves started so far
+            no_moves = ply // 2 + 1
+            depth = configs[player][1]
+            booked = book.lookup(board, True, player, 1 - player, heuristics[player], depth) if book else None
+            if booked is not None:
+                board.apply_move(*booked[1], player)
+                ply += 1
+                continue
+            stats = SearchStats(timing=move_stats is not None)
+            start = time.perf_counter()
+            if time_limit is None:
+                tables[player].new_search()
+                orderings[player].new_search()
+                _, move = minimax(board, depth, -math.inf, math.inf, True, player, 1 - player,
+                                  no_moves, heuristics[player], tables[player], None, stats, orderings[player])
+                stats.depth = depth
+                stats.search_time = time.perf_counter() - start
+            else:
+                _, move, _ = iterative_deepening(board, time_limit, True, player, 1 - player, no_moves,
+                                                 heuristics[player], depth, tables[player], stats,
+                                                 orderings[player])
+            seconds[player] += stats.search_time
+            nodes[player] += stats.nodes
+            if move_stats is not None:
+                move_stats.append(dict(stats.as_dict(), ply=ply, player=player,
+                                       config=config_name(configs[player])))
+            if move is None:
+                move = rng.choice(board.get_valid_moves(player))
+        board.apply_move(*move, player)
+        ply += 1
+    return None, ply, nodes, seconds
+
+def _game_job(job):
+    game_id, a, b, a_first, seed, opening_plies, max_plies, time_limit, with_stats, book_path = job
+    first, second = (a, b) if a_first else (b, a)
+    move_stats = [] if with_stats else None
+    winner, plies, nodes, seconds = play_game(first, second, seed, opening_plies, max_plies, time_limit,
+                                              move_stats, book_path)
+    if winner is None:
+        score = 0.5
+    else:
+        score = 1.0 if (winner == 0) == a_first else 0.0
+    a_side = 0 if a_first else 1
+    return {"game": game_id, "a": list(a), "b": list(b), "a_first": a_first, "seed": seed,
+            "score_a": score, "plies": plies,
+            "nodes_a": nodes[a_side], "nodes_b": nodes[1 - a_side],
+            "seconds_a": seconds[a_side], "seconds_b": seconds[1 - a_side], "moves": move_stats}
+
+def tournament_jobs(configs, games_per_pair, seed=0, opening_plies=OPENING_PLIES, max_plies=MAX_PLIES,
+                    time_limit=None, with_stats=False, book_path=None):
+    rng = random.Random(seed)
+    jobs = []
+    for a, b in itertools.combinations(configs, 2):
+        for g in range(games_per_pair):
+            # consecutive games share an opening with colours swapped
+            if g % 2 == 0:
+                opening_seed = rng.getrandbits(32)
+            jobs.append((len(jobs), a, b, g % 2 == 0, opening_seed, opening_plies, max_plies, time_limit,
+                         with_stats, book_path))
+    return jobs
+
+def elo_ratings(configs, results, iterations=200):
+    # Bradley-Terry fit by minorization-maximization, draws counted as half
+    # a win each. Every config also gets one virtual draw against a fixed
+    # ELO_BASE opponent so perfect scores stay finite.
+    index = {config: i for i, config in enumerate(configs)}
+    n = len(configs)
+    wins = [0.5] * n
+    games = [[0] * (n + 1) for _ in range(n)]
+    for result in results:
+        i, j = index[tuple(result["a"])], index[tuple(result["b"])]
+        wins[i] += result["score_a"]
+        wins[j] += 1 - result["score_a"]
+        games[i][j] += 1
+        games[j][i] += 1
+    for i in range(n):
+        games[i][n] = 1
+    strength = [1.0] * (n + 1)
+    for _ in range(iterations):
+        new = [wins[i] / sum(games[i][j] / (strength[i] + strength[j]) for j in range(n + 1) if games[i][j])
+               for i in range(n)]
+        strength[:n] = new
+    return {config: ELO_BASE + 400 * math.log10(strength[index[config]]) for config in configs}
+
+def standings(configs, results):
+    rows = {config: {"games": 0, "wins": 0, "losses": 0, "draws": 0, "plies": 0, "nodes": 0, "seconds": 0.0}
+            for config in configs}
+    for result in results:
+        for side, score in (("a", result["score_a"]), ("b", 1 - result["score_a"])):
+            row = rows[tuple(result[side])]
+            row["games"] += 1
+            row["wins" if score == 1 else "losses" if score == 0 else "draws"] += 1
+            row["plies"] += result["plies"]
+            row["nodes"] += result["nodes_" + side]
+            row["seconds"] += result["seconds_" + side]
+    elo = elo_ratings(configs, results)
+    table = []
+    for config in configs:
+        row = rows[config]
+        games = row["games"] or 1
+        table.append({
+            "config": config_name(config), "heuristic": config[0], "depth": config[1],
+            "games": row["games"], "wins": row["wins"], "losses": row["losses"], "draws": row["draws"],
+            "win_rate": round((row["wins"] + 0.5 * row["draws"]) / games, 4),
+            "elo": round(elo[config], 1),
+            "avg_length": round(row["plies"] / games, 1),
+            "nodes": row["nodes"], "search_seconds": round(row["seconds"], 3),
+            "nodes_per_sec": round(row["nodes"] / row["seconds"]) if row["seconds"] else 0,
+        })
+    table.sort(key=lambda row: -row["elo"])
+    return table
+
+def run_tournament(configs, games_per_pair, workers=None, seed=0, opening_plies=OPENING_PLIES,
+                   max_plies=MAX_PLIES, time_limit=None, progress=True, with_stats=False, book_path=None):
+    jobs = tournament_jobs(configs, games_per_pair, seed, opening_plies, max_plies, time_limit, with_stats,
+                           book_path)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(jobs) or 1))
+    results = []
+    start = time.time()
+    if workers == 1:
+        finished = map(_game_job, jobs)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(workers)
+        finished = pool.imap_unordered(_game_job, jobs)
+    try:
+        for result in finished:
+            results.append(result)
+            if progress:
+                print(f"\r{len(results)}/{len(jobs)} games, {time.time() - start:.0f}s", end="", flush=True)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    if progress:
+        print()
+    results.sort(key=lambda result: result["game"])
+    return results
+
+def write_csv(path, table):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=STANDINGS_HEADER)
+        writer.writeheader()
+        writer.writerows(table)
+
+def write_json(path, table, results, settings):
+    games = [{k: v for k, v in result.items() if k != "moves"} for result in results]
+    with open(path, "w") as f:
+        json.dump({"settings": settings, "standings": table, "games": games}, f, indent=1)
+
+def write_move_stats(path, results):
+    # one JSON object per line for every searched move
+    with open(path, "w") as f:
+        for result in results:
+            for stats in result["moves"] or ():
+                f.write(json.dumps(dict(stats, game=result["game"])) + "\n")
+
+def _int_list(text):
+    return [int(x) for x in text.split(",") if x]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Round-robin self-play between Chain Reaction AI configurations")
+    parser.add_argument("--heuristics", type=_int_list, default=sorted(HEURISTICS),
+                        help="comma separated heuristic numbers (default: all)")
+    parser.add_argument("--depths", type=_int_list, default=[2], help="comma separated search depths")
+    parser.add_argument("--games", type=int, default=10, help="games per pairing (rounded up to even)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--opening-plies", type=int, default=OPENING_PLIES, help="random moves at the start")
+    parser.add_argument("--max-plies", type=int, default=MAX_PLIES)
+    parser.add_argument("--time-limit", type=float, default=None,
+                        help="seconds per move with iterative deepening up to depth (default: fixed depth)")
+    parser.add_argument("--csv", default="tournament.csv", help="standings output")
+    parser.add_argument("--json", default=None, help="standings and per-game results output")
+    parser.add_argument("--book", default=None, help="opening book file to play from")
+    parser.add_argument("--stats-json", default=None,
+                        help="time every search and write its statistics here, one JSON line per move")
+    args = parser.parse_args()
+    configs = [(h, d) for h in args.heuristics for d in args.depths]
+    games = args.games + args.games % 2
+    results = run_tournament(configs, games, args.workers, args.seed, args.opening_plies,
+                             args.max_plies, args.time_limit, with_stats=args.stats_json is not None,
+                             book_path=args.book)
+    table = standings(configs, results)
+    for row in table:
+        print(f"{row['config']:>18}  elo {row['elo']:7.1f}  win {row['win_rate']:.3f}  "
+              f"len {row['avg_length']:5.1f}  {row['nodes_per_sec']} nodes/s")
+    write_csv(args.csv, table)
+    if args.json:
+        write_json(args.json, table, results, vars(args))
+    if args.stats_json:
+        write_move_stats(args.stats_json, results)
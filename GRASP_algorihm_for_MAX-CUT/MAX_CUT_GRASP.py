@@ -1,157 +1,770 @@
 import random
 import os
 import csv
+import argparse
+import heapq
+import mmap
+import multiprocessing
+import struct
+import sys
+import tempfile
+import time
+from array import array
+from collections import deque
+
+try:
+    import numpy as np
+except ImportError:     # read_rud then parses with the chunked tokenizer below
+    np = None
+
+
+class CSRGraph:
+    # Compressed sparse row adjacency: the neighbours of v are
+    # indices[indptr[v]:indptr[v+1]] with matching entries in weights.
+    def __init__(self, n, indptr, indices, weights):
+        self.n = n
+        self.m = len(indices) // 2
+        self.indptr = indptr
+        self.indices = indices
+        self.weights = weights
+        self._edges = None
+
+    @classmethod
+    def from_edges(cls, n, us, vs, ws):
+        indptr = array('i', bytes(4 * (n + 1)))
+        for u in us:
+            indptr[u + 1] += 1
+        for v in vs:
+            indptr[v + 1] += 1
+        for v in range(n):
+            indptr[v + 1] += indptr[v]
+
+        size = indptr[n]
+        indices = array('i', bytes(4 * size))
+        weights = array(ws.typecode if isinstance(ws, array) else 'i', [0]) * size
+        pos = array('i', indptr)
+        for u, v, wght in zip(us, vs, ws):
+            indices[pos[u]] = v
+            weights[pos[u]] = wght
+            pos[u] += 1
+            indices[pos[v]] = u
+            weights[pos[v]] = wght
+            pos[v] += 1
+        return cls(n, indptr, indices, weights)
+
+    @classmethod
+    def from_adj_list(cls, adj_list):
+        n = len(adj_list)
+        indptr = array('i', [0])
+        for neighbours in adj_list:
+            indptr.append(indptr[-1] + len(neighbours))
+        indices = array('i', (v for neighbours in adj_list for v, wght in neighbours))
+        wghts = [wght for neighbours in adj_list for v, wght in neighbours]
+        try:
+            weights = array('i', wghts)
+        except TypeError:
+            weights = array('d', wghts)
+        return cls(n, indptr, indices, weights)
+
+    def edge_arrays(self):
+        # Each undirected edge once (u < v), in CSR order.
+        if self._edges is None:
+            eu, ev = array('i'), array('i')
+            ew = array(self.weights.typecode)
+            indptr, indices, weights = self.indptr, self.indices, self.weights
+            for u in range(self.n):
+                start, end = indptr[u], indptr[u + 1]
+                for v, wght in zip(indices[start:end], weights[start:end]):
+                    if u < v:
+                        eu.append(u)
+                        ev.append(v)
+                        ew.append(wght)
+            self._edges = (eu, ev, ew)
+        return self._edges
+
+    def neighbours(self, v):
+        start, end = self.indptr[v], self.indptr[v + 1]
+        return zip(self.indices[start:end], self.weights[start:end])
+
+    def __len__(self):
+        return self.n
+
+    def __getstate__(self):
+        # buffers mapped from a graph cache cannot be pickled; send copies
+        state = dict(self.__dict__)
+        for key in ('indptr', 'indices', 'weights'):
+            state[key] = _as_array(state[key])
+        if state['_edges'] is not None:
+            state['_edges'] = tuple(_as_array(buf) for buf in state['_edges'])
+        return state
+
+    def __getitem__(self, v):
+        return list(self.neighbours(v))
+
+
+def as_csr(graph):
+    if isinstance(graph, CSRGraph):
+        return graph
+    return CSRGraph.from_adj_list(graph)
+
+
+def side_array(n, Selected_set):
+    side = bytearray(n)
+    for v in Selected_set:
+        side[v] = 1
+    return side
+
+
+def _as_array(buf):
+    if isinstance(buf, memoryview):
+        return array(buf.format, buf)
+    return buf
+
+
+def read_rud(graph_no, chunk_size=1 << 20):
+    if np is not None:
+        return _read_rud_numpy(graph_no, chunk_size)
+    # Streams the edge list in fixed-size chunks and parses each chunk's
+    # integers in bulk; a token cut by a chunk boundary is carried over.
+    values = array('i')
+    with open(graph_no, 'rb') as f:
+        n, m = map(int, f.readline().split())
+        tail = b''
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            chunk = tail + chunk
+            tokens = chunk.split()
+            tail = b'' if chunk[-1:].isspace() else tokens.pop()
+            values.extend(map(int, tokens))
+        if tail:
+            values.append(int(tail))
+
+    us = array('i', (u - 1 for u in values[0::3]))
+    vs = array('i', (v - 1 for v in values[1::3]))
+    return n, m, CSRGraph.from_edges(n, us, vs, values[2::3])
+
+
+def _read_rud_numpy(graph_no, chunk_size=1 << 20):
+    # Streams the edge list in fixed-size chunks like read_rud, parsing each
+    # chunk with one np.fromstring call and carrying a cut token over. The
+    # CSR arrays are built with a stable sort, in the same order from_edges
+    # fills them: for each edge, v in u's list and then u in v's.
+    parts = []
+    with open(graph_no, 'rb') as f:
+        n, m = map(int, f.readline().split())
+        tail = b''
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            chunk = tail + chunk
+            tail = b''
+            if not chunk[-1:].isspace():
+                head = chunk.rsplit(None, 1)
+                chunk, tail = (b'', chunk) if len(head) == 1 else head
+            if chunk.strip():
+                parts.append(np.fromstring(chunk, dtype=np.int64, sep=' '))
+        if tail:
+            parts.append(np.array([int(tail)], dtype=np.int64))
+    values = np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+    us, vs, ws = values[0::3] - 1, values[1::3] - 1, values[2::3]
+    src = np.empty(2 * len(us), dtype=np.int64)
+    src[0::2], src[1::2] = us, vs
+    dst = np.empty_like(src)
+    dst[0::2], dst[1::2] = vs, us
+    order = np.argsort(src, kind='stable')
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+    indices = dst[order]
+    weights = np.repeat(ws, 2)[order]
+
+    # the edge arrays, each edge once with u < v in CSR order, as edge_arrays gives them
+    rows = np.repeat(np.arange(n), np.diff(indptr))
+    upper = rows < indices
+    graph = CSRGraph(n, *(_int_array(buf) for buf in (indptr, indices, weights)))
+    graph._edges = tuple(_int_array(buf) for buf in (rows[upper], indices[upper], weights[upper]))
+    return n, m, graph
+
+
+def _int_array(buf):
+    return array('i', buf.astype(np.int32).tobytes())
+
+
+# Binary CSR cache written next to each .rud file:
+#   header  magic, version, byte order, n, m, edge count, source size, source mtime
+#   body    indptr, indices, weights, edge u, edge v, edge weight (int32 each)
+CACHE_SUFFIX = '.csr'
+CACHE_MAGIC = b'CSRG'
+CACHE_VERSION = 1
+_CACHE_HEADER = struct.Struct('<4sHcxqqqqq')
+
+
+def _source_stamp(graph_no):
+    st = os.stat(graph_no)
+    return st.st_size, st.st_mtime_ns
+
+
+def write_graph_cache(graph_no, n, m, graph):
+    eu, ev, ew = graph.edge_arrays()
+    size, mtime = _source_stamp(graph_no)
+    header = _CACHE_HEADER.pack(CACHE_MAGIC, CACHE_VERSION, sys.byteorder[0].encode(),
+                                n, m, len(eu), size, mtime)
+    # every writer gets its own temp file, so processes that miss the cache
+    # at the same time never truncate each other's file before os.replace
+    fd, tmp_path = tempfile.mkstemp(suffix='.tmp', prefix=os.path.basename(graph_no) + CACHE_SUFFIX + '.',
+                                    dir=os.path.dirname(graph_no) or '.')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(header)
+            for buf in (graph.indptr, graph.indices, graph.weights, eu, ev, ew):
+                f.write(_as_array(buf).tobytes())
+        os.replace(tmp_path, graph_no + CACHE_SUFFIX)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def read_graph_cache(graph_no):
+    # Returns (n, m, graph) backed by a read-only mmap of the cache, or None
+    # if there is no cache or it no longer matches the source file.
+    try:
+        with open(graph_no + CACHE_SUFFIX, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    if len(mm) < _CACHE_HEADER.size:
+        return None
+    magic, version, order, n, m, edges, size, mtime = _CACHE_HEADER.unpack_from(mm)
+    if (magic != CACHE_MAGIC or version != CACHE_VERSION or order != sys.byteorder[0].encode()
+            or (size, mtime) != _source_stamp(graph_no)
+            or len(mm) < _CACHE_HEADER.size + 4 * (n + 1)):
+        return None
+    # CSR entries: self-loops are in the adjacency lists but not in the
+    # edge arrays, so this can exceed 2 * edges
+    entries = struct.unpack_from('i', mm, _CACHE_HEADER.size + 4 * n)[0]
+    if len(mm) != _CACHE_HEADER.size + 4 * (n + 1 + 2 * entries + 3 * edges):
+        return None
+
+    view = memoryview(mm)
+    buffers = []
+    offset = _CACHE_HEADER.size
+    for length in (n + 1, entries, entries, edges, edges, edges):
+        buffers.append(view[offset:offset + 4 * length].cast('i'))
+        offset += 4 * length
+    graph = CSRGraph(n, buffers[0], buffers[1], buffers[2])
+    graph._edges = tuple(buffers[3:])
+    return n, m, graph
+
+
+def load_graph(graph_no, use_cache=True):
+    if use_cache:
+        cached = read_graph_cache(graph_no)
+        if cached is not None:
+            return cached
+    n, m, graph = read_rud(graph_no)
+    if use_cache:
+        try:
+            write_graph_cache(graph_no, n, m, graph)
+        except OSError:
+            pass
+    return n, m, graph
+
+
+def graph_maker(graph_no, csr=False, use_cache=False):
+    n, m, graph = load_graph(graph_no, use_cache)
+    if csr:
+        return n, m, graph
+
+    adj_list = [graph[v] for v in range(n)]
+    return n, m, adj_list
 
-def graph_maker(graph_no):
-    with open(graph_no, 'r') as f:
-        lines = f.readlines()
 
-    n, m = map(int, lines[0].split())
-    adj_list = [[] for ii in range(n)]
 
-    for line in lines[1:]:
-        u, v, wght = map(int, line.split())
-        u -= 1
-        v -= 1
-        adj_list[u].append((v, wght))
-        adj_list[v].append((u, wght))  
+# Cut evaluation over the edge arrays. A partition mask gives every vertex
+# an int whose bit j says which side it is on in partition j, so a single
+# XOR per edge scores that edge for every partition in the batch at once.
+def cut_weight_total(graph, masks):
+    eu, ev, ew = graph.edge_arrays()
+    return sum(wght * (masks[u] ^ masks[v]).bit_count() for u, v, wght in zip(eu, ev, ew))
 
-    return n, m, adj_list
 
+def batch_cut_values(graph, masks, count):
+    # bit-sliced counters per edge weight: planes[k] holds bit k of the
+    # number of cut edges of that weight, for all partitions side by side
+    counters = {}
+    eu, ev, ew = graph.edge_arrays()
+    for u, v, wght in zip(eu, ev, ew):
+        carry = masks[u] ^ masks[v]
+        planes = counters.setdefault(wght, [])
+        k = 0
+        while carry:
+            if k == len(planes):
+                planes.append(carry)
+                break
+            plane = planes[k]
+            planes[k] = plane ^ carry
+            carry &= plane
+            k += 1
 
+    values = [0] * count
+    for wght, planes in counters.items():
+        for k, plane in enumerate(planes):
+            step = wght << k if isinstance(wght, int) else wght * (1 << k)
+            bits = bin(plane)[2:][::-1]
+            for j in range(min(count, len(bits))):
+                if bits[j] == '1':
+                    values[j] += step
+    return values
 
-def randomized_max_cut(adj_list, iteration=100):
-    num_vertices = len(adj_list)
-    tot_weight = 0
 
-    for ii in range(iteration):
-        X = set()
-        Y = set()
+def random_partition_masks(n, iteration, rng=random):
+    # an n x iteration random bit matrix, one row (int) per vertex
+    return [rng.getrandbits(iteration) for v in range(n)]
 
-        for v in range(num_vertices):
-            if random.random() >= 0.5:
-                X.add(v)
-            else:
-                Y.add(v)
 
-        cut_weight = 0
-        visited = set()
-        for u in range(num_vertices):
-            for v, wght in adj_list[u]:
-                if (u, v) not in visited and (v, u) not in visited:
-                    if (u in X) != (v in X):
-                        cut_weight += wght
-                    visited.add((u, v))
+def randomized_max_cut(adj_list, iteration=100, rng=random):
+    graph = as_csr(adj_list)
+    masks = random_partition_masks(graph.n, iteration, rng)
+    return cut_weight_total(graph, masks) / iteration
 
-        tot_weight += cut_weight
 
-    return tot_weight / iteration
+def randomized_cut_values(adj_list, iteration=100, rng=random):
+    graph = as_csr(adj_list)
+    masks = random_partition_masks(graph.n, iteration, rng)
+    return batch_cut_values(graph, masks, iteration)
 
 
 def greedy_max_cut(adj_list):
-    n = len(adj_list)
-    X, Y = set(), set()
+    graph = as_csr(adj_list)
+    n = graph.n
+    indptr, indices, weights = graph.indptr, graph.indices, graph.weights
     max_weight = -1
     max_wght_edge = (0, 1)
 
-    for u in range(n):
-        for v, wght in adj_list[u]:
-            if u < v and wght > max_weight:
-                max_weight = wght
-                max_wght_edge = (u, v)
+    for u, v, wght in zip(*graph.edge_arrays()):
+        if wght > max_weight:
+            max_weight = wght
+            max_wght_edge = (u, v)
 
+    # side: 0 unassigned, 1 in X, 2 in Y
+    side = bytearray(n)
     u, v = max_wght_edge
-    X.add(u)
-    Y.add(v)
-    U = set(range(n)) - {u, v}
-
-    for z in U:
-        wghtX = sum(wght for adjacent, wght in adj_list[z] if adjacent in Y)
-        wghtY = sum(wght for adjacent, wght in adj_list[z] if adjacent in X)
-        if wghtX > wghtY:
-            X.add(z)
-        else:
-            Y.add(z)
-
+    side[u] = 1
+    side[v] = 2
+
+    for z in range(n):
+        if side[z]:
+            continue
+        wghtX = 0
+        wghtY = 0
+        start, end = indptr[z], indptr[z + 1]
+        for adjacent, wght in zip(indices[start:end], weights[start:end]):
+            if side[adjacent] == 2:
+                wghtX += wght
+            elif side[adjacent] == 1:
+                wghtY += wght
+        side[z] = 1 if wghtX > wghtY else 2
+
+    X = {z for z in range(n) if side[z] == 1}
+    Y = {z for z in range(n) if side[z] == 2}
     return X, Y
 
 
-def semi_greedy(adj_list, alpha=0.3):
-    n = len(adj_list)
-    V = set(range(n))
-    X, Y = set(), set()
-    V_prime = V.copy()
+def semi_greedy(adj_list, alpha=0.3, rcl_tries=16, rng=random):
+    graph = as_csr(adj_list)
+    n = graph.n
+    indptr, indices, weights = graph.indptr, graph.indices, graph.weights
+    side = bytearray(n)
+    sigma_X = [0] * n
+    sigma_Y = [0] * n
 
-    while V_prime:
-        sigma_X = {v: sum(wght for u, wght in adj_list[v] if u in X) for v in V_prime}
-        sigma_Y = {v: sum(wght for u, wght in adj_list[v] if u in Y) for v in V_prime}
-        greedy_values = {v: max(sigma_X[v], sigma_Y[v]) for v in V_prime}
+    # unplaced vertices, with O(1) swap-removal
+    V_prime = list(range(n))
+    position = list(range(n))
 
-        wmin = min(min(sigma_X.values(), default=0), min(sigma_Y.values(), default=0))
-        wmax = max(max(sigma_X.values(), default=0), max(sigma_Y.values(), default=0))
+    # lazy heaps over unplaced vertices: min(sigma_X, sigma_Y) gives wmin,
+    # max(sigma_X, sigma_Y) gives wmax; stale entries are dropped on top
+    low_heap = [(0, v) for v in range(n)]
+    high_heap = [(0, v) for v in range(n)]
+
+    while V_prime:
+        while True:
+            w, v = low_heap[0]
+            if not side[v] and w == min(sigma_X[v], sigma_Y[v]):
+                break
+            heapq.heappop(low_heap)
+        while True:
+            w, v = high_heap[0]
+            if not side[v] and -w == max(sigma_X[v], sigma_Y[v]):
+                break
+            heapq.heappop(high_heap)
+        wmin = low_heap[0][0]
+        wmax = -high_heap[0][0]
 
         mu = wmin + alpha * (wmax - wmin)
 
-        RCL = [v for v in V_prime if greedy_values[v] >= mu]
-        v_choice = random.choice(RCL) if RCL else random.choice(list(V_prime))
+        # uniform pick from the RCL: rejection-sample the candidate list and
+        # only build the full RCL when it turns out to be a small fraction
+        v_choice = None
+        for ii in range(rcl_tries):
+            v = V_prime[rng.randrange(len(V_prime))]
+            if max(sigma_X[v], sigma_Y[v]) >= mu:
+                v_choice = v
+                break
+        if v_choice is None:
+            RCL = [v for v in V_prime if max(sigma_X[v], sigma_Y[v]) >= mu]
+            v_choice = rng.choice(RCL) if RCL else rng.choice(V_prime)
 
         if sigma_X[v_choice] >= sigma_Y[v_choice]:
-            Y.add(v_choice)
+            side[v_choice] = 2
+            sigma = sigma_Y
         else:
-            X.add(v_choice)
-
-        V_prime.remove(v_choice)
-
-    return X
-
-def local_search(adj_list, Selected_set):
-    n = len(adj_list)
-    improved = True
-    while improved:
-        improved = False
-        for v in range(n):
-            gain = 0
-            for u, wght in adj_list[v]:
-                if (u in Selected_set) == (v in Selected_set):
-                    gain += wght
-                else:
-                    gain -= wght
-            if gain > 0:
-                if (v in Selected_set):
-                    Selected_set.remove(v)
-                else:
-                    Selected_set.add(v)
-                improved = True
+            side[v_choice] = 1
+            sigma = sigma_X
+
+        last = V_prime.pop()
+        if last != v_choice:
+            V_prime[position[v_choice]] = last
+            position[last] = position[v_choice]
+
+        start, end = indptr[v_choice], indptr[v_choice + 1]
+        for u, wght in zip(indices[start:end], weights[start:end]):
+            if side[u]:
+                continue
+            sigma[u] += wght
+            sx, sy = sigma_X[u], sigma_Y[u]
+            if sx < sy:
+                heapq.heappush(low_heap, (sx, u))
+                heapq.heappush(high_heap, (-sy, u))
+            else:
+                heapq.heappush(low_heap, (sy, u))
+                heapq.heappush(high_heap, (-sx, u))
+
+    return {v for v in range(n) if side[v] == 1}
+
+def flip_gains(graph, side):
+    # gain[v]: change in cut weight if v switches sides
+    indptr, indices, weights = graph.indptr, graph.indices, graph.weights
+    gain = [0] * graph.n
+    for v in range(graph.n):
+        sv = side[v]
+        g = 0
+        start, end = indptr[v], indptr[v + 1]
+        for u, wght in zip(indices[start:end], weights[start:end]):
+            if side[u] == sv:
+                g += wght
+            else:
+                g -= wght
+        gain[v] = g
+    return gain
+
+
+def apply_flip(graph, side, gain, v):
+    # Moves v to the other side and patches the gains of its neighbours.
+    indptr, indices, weights = graph.indptr, graph.indices, graph.weights
+    sv = side[v]
+    side[v] = sv ^ 1
+    gain[v] = -gain[v]
+    start, end = indptr[v], indptr[v + 1]
+    for u, wght in zip(indices[start:end], weights[start:end]):
+        if side[u] == sv:
+            gain[u] -= 2 * wght
+        else:
+            gain[u] += 2 * wght
+
+
+def flip_vertex(graph, side, gain, v):
+    # apply_flip, done before this returns; the returned generator yields
+    # each neighbour whose gain is now positive.
+    apply_flip(graph, side, gain, v)
+    start, end = graph.indptr[v], graph.indptr[v + 1]
+    return (u for u in graph.indices[start:end] if gain[u] > 0)
+
+
+def gain_local_search(adj_list, Selected_set, strategy='first'):
+    graph = as_csr(adj_list)
+    side = side_array(graph.n, Selected_set)
+    gain = flip_gains(graph, side)
+
+    if strategy == 'best':
+        # max-heap on gain; entries whose gain has since changed are skipped
+        heap = [(-g, v) for v, g in enumerate(gain) if g > 0]
+        heapq.heapify(heap)
+        while heap:
+            g, v = heapq.heappop(heap)
+            if -g != gain[v]:
+                continue
+            for u in flip_vertex(graph, side, gain, v):
+                heapq.heappush(heap, (-gain[u], u))
+    elif strategy == 'first':
+        queue = deque(v for v in range(graph.n) if gain[v] > 0)
+        queued = bytearray(graph.n)
+        for v in queue:
+            queued[v] = 1
+        while queue:
+            v = queue.popleft()
+            queued[v] = 0
+            if gain[v] <= 0:
+                continue
+            for u in flip_vertex(graph, side, gain, v):
+                if not queued[u]:
+                    queued[u] = 1
+                    queue.append(u)
+    else:
+        raise ValueError(f"unknown local search strategy: {strategy}")
+
+    Selected_set.clear()
+    Selected_set.update(v for v in range(graph.n) if side[v])
     return Selected_set
 
+def local_search(adj_list, Selected_set, strategy='first'):
+    return gain_local_search(adj_list, Selected_set, strategy)
+
 def cut_value_local(adj_list, Selected_set):
-    total = 0
-    for u in range(len(adj_list)):
-        for v, wght in adj_list[u]:
-            if u < v and ((u in Selected_set) != (v in Selected_set)):
-                total += wght
-    return total
-
-def GRASP_max_cut(adj_list, max_iterations=100, alpha=0.3):
+    graph = as_csr(adj_list)
+    return cut_weight_total(graph, side_array(graph.n, Selected_set))
+
+def cut_distance(side_a, side_b):
+    # S and its complement are the same cut, so count differences modulo that
+    diff = sum(a != b for a, b in zip(side_a, side_b))
+    return min(diff, len(side_a) - diff)
+
+
+def path_relinking(graph, Selected_set, guide_set):
+    # Walks from Selected_set towards guide_set, each step flipping the
+    # differing vertex with the best gain, and returns the best
+    # intermediate partition on the path (None when the two are adjacent).
+    n = graph.n
+    side = side_array(n, Selected_set)
+    guide = side_array(n, guide_set)
+    remaining = {v for v in range(n) if side[v] != guide[v]}
+    if len(remaining) > n // 2:
+        remaining = set(range(n)) - remaining
+
+    gain = flip_gains(graph, side)
+    val = cut_weight_total(graph, side)
+    best_val, best_side = float('-inf'), None
+    while len(remaining) > 1:
+        v = max(remaining, key=gain.__getitem__)
+        remaining.remove(v)
+        val += gain[v]
+        apply_flip(graph, side, gain, v)
+        if val > best_val:
+            best_val, best_side = val, bytes(side)
+
+    if best_side is None:
+        return None
+    return {v for v in range(n) if best_side[v]}
+
+
+def update_elite(elite, val, Selected_set, n, elite_size, min_distance):
+    # elite: list of (value, side bytes). A solution enters while the pool
+    # has room, or if it beats the worst member; unless it is a new best it
+    # must also be at least min_distance from every member. When the pool is
+    # full it replaces the most similar member that is no better than it.
+    side = bytes(side_array(n, Selected_set))
+    distances = [cut_distance(side, member) for member_val, member in elite]
+    if distances and min(distances) == 0:
+        return False
+    is_best = not elite or val > max(member_val for member_val, member in elite)
+    if not is_best and distances and min(distances) < min_distance:
+        return False
+    if len(elite) < elite_size:
+        elite.append((val, side))
+        return True
+    worse = [k for k, (member_val, member) in enumerate(elite) if member_val <= val]
+    if not worse or val <= min(member_val for member_val, member in elite):
+        return False
+    k = min(worse, key=distances.__getitem__)
+    elite[k] = (val, side)
+    return True
+
+
+def GRASP_max_cut_timed(adj_list, time_limit=None, target=None, max_iterations=None,
+                        alpha=0.3, rng=random, elite_size=0, min_distance=None, counter=None, start=None):
+    # Stops at whichever comes first: time_limit seconds, a cut of at least
+    # target, or max_iterations. trace holds (elapsed, iteration, best value)
+    # for every improvement plus the final state. With elite_size > 0 each
+    # local optimum is also path-relinked towards a random elite solution,
+    # and both it and the relinked solution are offered to the elite pool.
+    # Runs that share a counter (a multiprocessing.Value) and a start time
+    # record in trace the iterations finished by all of them together.
+    if time_limit is None and target is None and max_iterations is None:
+        raise ValueError("GRASP needs a time limit, a target or an iteration count")
+    graph = as_csr(adj_list)
     best_val = float('-inf')
-
-    for ii in range(max_iterations):
-        Selected_set = semi_greedy(adj_list, alpha)
-        Selected_set = local_search(adj_list, Selected_set)
-        val = cut_value_local(adj_list, Selected_set)
+    best_set = None
+    trace = []
+    elite = []
+    if min_distance is None:
+        min_distance = max(1, graph.n // 100)
+    if start is None:
+        start = time.perf_counter()
+
+    ii = done = 0
+    while max_iterations is None or ii < max_iterations:
+        if time_limit is not None and time.perf_counter() - start >= time_limit:
+            break
+        Selected_set = semi_greedy(graph, alpha, rng=rng)
+        Selected_set = local_search(graph, Selected_set)
+        val = cut_value_local(graph, Selected_set)
+        if elite_size:
+            candidates = [(val, Selected_set)]
+            if elite:
+                guide_val, guide = rng.choice(elite)
+                relinked = path_relinking(graph, Selected_set, {v for v in range(graph.n) if guide[v]})
+                if relinked is not None:
+                    relinked = local_search(graph, relinked)
+                    candidates.append((cut_value_local(graph, relinked), relinked))
+            for candidate_val, candidate in candidates:
+                update_elite(elite, candidate_val, candidate, graph.n, elite_size, min_distance)
+            # the local optimum is kept on ties
+            val, Selected_set = max(candidates, key=lambda candidate: candidate[0])
+        ii += 1
+        if counter is None:
+            elapsed, done = time.perf_counter() - start, ii
+        else:
+            with counter.get_lock():
+                counter.value += 1
+                elapsed, done = time.perf_counter() - start, counter.value
         if val > best_val:
             best_val = val
-
+            best_set = Selected_set
+            trace.append((elapsed, done, best_val))
+            if target is not None and best_val >= target:
+                break
+
+    if not trace or trace[-1][1] != done:
+        trace.append((time.perf_counter() - start, done, best_val))
+    return best_val, best_set, trace
+
+def time_to_target(trace, target):
+    for elapsed, ii, best_val in trace:
+        if best_val >= target:
+            return elapsed
+    return None
+
+def time_to_best_known(trace, i):
+    # the CSV cell for graph Gi: blank when the best value is unknown or
+    # GRASP never reached it
+    elapsed = time_to_target(trace, best_known[i-1]) if best_known[i-1] else None
+    return "" if elapsed is None else f"{elapsed:.6f}"
+
+def grasp_iterations(graph, iterations, alpha=0.3, rng=random):
+    best_val, best_set, trace = GRASP_max_cut_timed(graph, max_iterations=iterations,
+                                                    alpha=alpha, rng=rng)
+    return best_val, best_set
+
+def GRASP_max_cut(adj_list, max_iterations=100, alpha=0.3, rng=random):
+    best_val, best_set = grasp_iterations(as_csr(adj_list), max_iterations, alpha, rng)
     return  best_val
 
+def GRASP_PR_max_cut(adj_list, max_iterations=100, alpha=0.3, elite_size=10, rng=random):
+    best_val, best_set, trace = GRASP_max_cut_timed(adj_list, max_iterations=max_iterations,
+                                                    alpha=alpha, rng=rng, elite_size=elite_size)
+    return best_val
+
+
+# Graph shared with pool workers: inherited through fork, or handed to each
+# worker once by the pool initializer where fork is unavailable.
+_shared_graph = None
+_shared_counter = None
+
+def _init_grasp_worker(graph, counter=None):
+    global _shared_graph, _shared_counter
+    _shared_graph = graph
+    _shared_counter = counter
+
+def _grasp_chunk(task):
+    w, time_limit, target, iterations, alpha, elite_size, seed, start = task
+    return w, GRASP_max_cut_timed(_shared_graph, time_limit, target, iterations, alpha, random.Random(seed),
+                                  elite_size, counter=_shared_counter, start=start)
+
+def parallel_GRASP_max_cut_timed(adj_list, time_limit=None, target=None, max_iterations=None, alpha=0.3,
+                                 workers=None, seed=None, elite_size=0):
+    # GRASP_max_cut_timed split over worker processes: the iterations are
+    # shared out, while time_limit and target apply to every worker. The
+    # first worker to reach target stops the others. Ties between workers go
+    # to the lowest worker index. The merged trace holds each improvement of
+    # the overall best in time order; all workers share one clock and one
+    # iteration counter, so its iteration column always counts the
+    # iterations finished by all workers together, as in a serial run.
+    if time_limit is None and target is None and max_iterations is None:
+        raise ValueError("GRASP needs a time limit, a target or an iteration count")
+    graph = as_csr(adj_list)
+    graph.edge_arrays()
+    workers = workers or os.cpu_count() or 1
+    if max_iterations is not None:
+        workers = min(workers, max_iterations)
+    workers = max(1, workers)
+    if seed is None:
+        seed = random.randrange(2**32)
+
+    # one independent RNG stream per worker, derived from the master seed
+    master = random.Random(seed)
+    start = time.perf_counter()
+    tasks = []
+    for w in range(workers):
+        iterations = None
+        if max_iterations is not None:
+            iterations = max_iterations // workers + (1 if w < max_iterations % workers else 0)
+        tasks.append((w, time_limit, target, iterations, alpha, elite_size, master.getrandbits(64), start))
+
+    results = []
+    if workers == 1:
+        _init_grasp_worker(graph)
+        results = [_grasp_chunk(task) for task in tasks]
+        total = results[0][1][2][-1][1]
+    else:
+        if 'fork' in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context('fork')
+            counter = context.Value('q', 0)
+            _init_grasp_worker(graph, counter)
+            pool = context.Pool(workers)
+        else:
+            counter = multiprocessing.Value('q', 0)
+            pool = multiprocessing.Pool(workers, _init_grasp_worker, (graph, counter))
+        with pool:
+            for result in pool.imap_unordered(_grasp_chunk, tasks):
+                results.append(result)
+                if target is not None and result[1][0] >= target:
+                    break
+        total = counter.value
+    results = [result for w, result in sorted(results, key=lambda result: result[0])]
+
+    best_val, best_set = float('-inf'), None
+    for val, Selected_set, worker_trace in results:
+        if val > best_val:
+            best_val, best_set = val, Selected_set
+    trace = []
+    for elapsed, done, val in sorted(entry for result in results for entry in result[2]):
+        if not trace or val > trace[-1][2]:
+            trace.append((elapsed, done, val))
+    final = (max(result[2][-1][0] for result in results), total, best_val)
+    if final != trace[-1]:
+        trace.append(final)
+    return best_val, best_set, trace
+
+def parallel_GRASP_max_cut(adj_list, max_iterations=100, alpha=0.3, workers=None, seed=None):
+    best_val, best_set, trace = parallel_GRASP_max_cut_timed(adj_list, max_iterations=max_iterations,
+                                                             alpha=alpha, workers=workers, seed=seed)
+    return best_val, best_set
+
 
 def cut_value_greedy(adj_list, X, Y):
-    total = 0
-    for u in X:
-        for v, wght in adj_list[u]:
-            if v in Y:
-                total += wght
-    return total
+    graph = as_csr(adj_list)
+    if len(X) + len(Y) == graph.n:
+        return cut_weight_total(graph, side_array(graph.n, X))
+    # X and Y do not cover V: only count edges running between them
+    side = bytearray(graph.n)
+    for v in X:
+        side[v] = 1
+    for v in Y:
+        side[v] = 2
+    eu, ev, ew = graph.edge_arrays()
+    return sum(wght for u, v, wght in zip(eu, ev, ew) if side[u] ^ side[v] == 3)
 
 
 best_known = [12078, 12084, 12077, 0, 0, 0, 0, 0, 0, 0, 
@@ -159,56 +772,60 @@ best_known = [12078, 12084, 12077, 0, 0, 0, 0, 0, 0, 0,
 14123, 14129, 14131, 0, 0, 0, 0, 0, 0, 0, 
 1560, 1537, 1541, 8000, 7996, 8009, 0, 0, 0, 0, 0, 
 7027, 7022, 7020, 0, 0, 6000, 6000, 5988, 0, 0, 0, 0]
-def process_all_rud_files(folder_path, output_csv_path):
+HEADER_ROWS = [
+    ["Problem", "", "",
+     "Constructive algorithm", "", "",
+     "Local search", "",
+     "GRASP", "",
+     "Known best solution or upper bound",
+     "GRASP time to known best (s)"],
+    ["Name", "|V| or n", "|E| or m",
+     "Simple Randomized or Randomized-1",
+     "Simple Greedy or Greedy-1",
+     "Semi-greedy-1",
+     "Simple local or local-1", "",
+     "GRASP-1", "",
+     "", ""],
+    ["", "", "", "", "", "",
+     "No. of iterations", "Average value",
+     "No. of iterations", "Best value",
+     "", ""],
+]
+RANDOMIZED_ITERATIONS = 50
+LOCAL_RUNS = 5
+GRASP_ITERATIONS = 50
+
+def process_all_rud_files(folder_path, output_csv_path, grasp_workers=1):
 
     with open(output_csv_path, 'w', newline='') as csvfile:
         writer = csv.writer(csvfile)
-    
-        writer.writerow([
-            "Problem", "", "", 
-            "Constructive algorithm", "", "", 
-            "Local search", "", 
-            "GRASP", "", 
-            "Known best solution or upper bound"
-        ])
-        print("First row written.")    
-        
-        writer.writerow([
-            "Name", "|V| or n", "|E| or m", 
-            "Simple Randomized or Randomized-1", 
-            "Simple Greedy or Greedy-1", 
-            "Semi-greedy-1", 
-            "Simple local or local-1", "", 
-            "GRASP-1", "", 
-            ""
-        ])
-        print("Second row written.")
-        
-        writer.writerow([
-            "", "", "", "", "", "", 
-            "No. of iterations", "Average value", 
-            "No. of iterations", "Best value", 
-            ""
-        ])
-        print("Third row written.")
+
+        for row_name, row in zip(["First", "Second", "Third"], HEADER_ROWS):
+            writer.writerow(row)
+            print(f"{row_name} row written.")
         for i in range(1, 55):
             file_name = f"g{i}.rud"
             graph_no = os.path.join(folder_path, file_name)
-            n, m, adj_matrix = graph_maker(graph_no)
+            n, m, adj_matrix = load_graph(graph_no)
 
 
             graph_name = f"G{i}"
-            rand1 = randomized_max_cut(adj_matrix, 50)
+            rand1 = randomized_max_cut(adj_matrix, RANDOMIZED_ITERATIONS)
             X, Y = greedy_max_cut(adj_matrix)
             greedy1 = cut_value_greedy(adj_matrix, X, Y)
             semi_greedy1 = cut_value_local(adj_matrix, semi_greedy(adj_matrix))
 
             local_avg = 0
-            for j in range(1, 6):
+            for j in range(LOCAL_RUNS):
                 local_sol = local_search(adj_matrix, semi_greedy(adj_matrix, 0.3))
                 local_avg = local_avg+cut_value_local(adj_matrix, local_sol)
-            local_avg = local_avg / 5
-            grasp_best = GRASP_max_cut(adj_matrix, 50)
+            local_avg = local_avg / LOCAL_RUNS
+            if grasp_workers > 1:
+                grasp_best, grasp_set, grasp_trace = parallel_GRASP_max_cut_timed(
+                    adj_matrix, max_iterations=GRASP_ITERATIONS, workers=grasp_workers)
+            else:
+                grasp_best, grasp_set, grasp_trace = GRASP_max_cut_timed(adj_matrix,
+                                                                         max_iterations=GRASP_ITERATIONS)
 
 
             writer.writerow([
@@ -216,14 +833,188 @@ def process_all_rud_files(folder_path, output_csv_path):
                 rand1,
                 greedy1,
                 semi_greedy1,
-                5, local_avg,
-                50, grasp_best,
-                best_known[i-1]
+                LOCAL_RUNS, local_avg,
+                GRASP_ITERATIONS, grasp_best,
+                best_known[i-1],
+                time_to_best_known(grasp_trace, i)
             ])
             print(f"row {i} written for {file_name}")
 
 
+# Batch runner: one job per (graph, algorithm), biggest graphs first.
+BATCH_ALGORITHMS = ['grasp', 'local', 'semi_greedy', 'greedy', 'randomized']
+
+_batch_graph = (None, None)
+
+def _batch_load(graph_no):
+    global _batch_graph
+    if _batch_graph[0] != graph_no:
+        _batch_graph = (graph_no, load_graph(graph_no))
+    return _batch_graph[1]
+
+def _batch_job(job):
+    i, algorithm, graph_no, seed, grasp_time_limit, stop_at_best_known, elite_size, grasp_workers = job
+    graph = _batch_load(graph_no)[2]
+    rng = random.Random(f"{seed}:{i}:{algorithm}")
+
+    if algorithm == 'randomized':
+        value = randomized_max_cut(graph, RANDOMIZED_ITERATIONS, rng)
+    elif algorithm == 'greedy':
+        X, Y = greedy_max_cut(graph)
+        value = cut_value_greedy(graph, X, Y)
+    elif algorithm == 'semi_greedy':
+        value = cut_value_local(graph, semi_greedy(graph, rng=rng))
+    elif algorithm == 'local':
+        value = 0
+        for j in range(LOCAL_RUNS):
+            value += cut_value_local(graph, local_search(graph, semi_greedy(graph, 0.3, rng=rng)))
+        value = value / LOCAL_RUNS
+    else:
+        target = best_known[i-1] if stop_at_best_known and best_known[i-1] else None
+        max_iterations = None if grasp_time_limit else GRASP_ITERATIONS
+        if grasp_workers > 1:
+            best_val, best_set, trace = parallel_GRASP_max_cut_timed(graph, grasp_time_limit, target,
+                                                                     max_iterations, 0.3, grasp_workers,
+                                                                     rng.getrandbits(64), elite_size)
+        else:
+            best_val, best_set, trace = GRASP_max_cut_timed(graph, grasp_time_limit, target,
+                                                            max_iterations, 0.3, rng, elite_size)
+        value = (best_val, trace[-1][1], trace)
+    return i, algorithm, value
+
+TRACE_HEADER = ["Name", "Algorithm", "Elapsed (s)", "Iteration", "Best value"]
+
+def trace_csv_path(output_csv_path):
+    root, ext = os.path.splitext(output_csv_path)
+    return f"{root}_trace{ext or '.csv'}"
+
+def _read_trace_rows(trace_path, finished):
+    rows = []
+    if not os.path.exists(trace_path):
+        return rows
+    with open(trace_path, newline='') as csvfile:
+        for row in list(csv.reader(csvfile))[1:]:
+            if len(row) == len(TRACE_HEADER) and row[0][1:].isdigit() and int(row[0][1:]) in finished:
+                rows.append(row)
+    return rows
+
+def _read_finished_rows(output_csv_path):
+    rows = {}
+    if not os.path.exists(output_csv_path):
+        return rows
+    with open(output_csv_path, newline='') as csvfile:
+        for row in list(csv.reader(csvfile))[len(HEADER_ROWS):]:
+            # tables written before the time-to-target column lack the last cell
+            if len(row) == len(HEADER_ROWS[0]) - 1:
+                row.append("")
+            if len(row) == len(HEADER_ROWS[0]) and row[0][:1] == "G" and row[0][1:].isdigit():
+                rows[int(row[0][1:])] = row
+    return rows
+
+def _write_finished_rows(output_csv_path, rows):
+    # The whole table is rewritten in graph order through a temporary file,
+    # so an interrupted run never leaves a half written CSV behind.
+    tmp_path = output_csv_path + ".tmp"
+    with open(tmp_path, 'w', newline='') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerows(HEADER_ROWS)
+        writer.writerows(rows[i] for i in sorted(rows))
+    os.replace(tmp_path, output_csv_path)
+
+def _batch_results(jobs, workers):
+    # Pool workers are daemonic and cannot start pools of their own, so GRASP
+    # jobs with several grasp workers run here, one after another, once the
+    # other jobs are done.
+    pool_jobs = [job for job in jobs if job[1] != 'grasp' or job[-1] <= 1]
+    own_jobs = [job for job in jobs if job[1] == 'grasp' and job[-1] > 1]
+    if pool_jobs:
+        with multiprocessing.Pool(workers) as pool:
+            yield from pool.imap_unordered(_batch_job, pool_jobs)
+    for job in own_jobs:
+        yield _batch_job(job)
+
+def batch_process_rud_files(folder_path, output_csv_path, workers=None, resume=False, seed=0,
+                            grasp_time_limit=None, stop_at_best_known=False, elite_size=0, grasp_workers=1):
+    finished = _read_finished_rows(output_csv_path) if resume else {}
+    trace_path = trace_csv_path(output_csv_path)
+    finished_trace = _read_trace_rows(trace_path, finished)
+
+    sizes = {}
+    for i in range(1, 55):
+        graph_no = os.path.join(folder_path, f"g{i}.rud")
+        if i in finished or not os.path.exists(graph_no):
+            continue
+        with open(graph_no) as f:
+            n, m = map(int, f.readline().split())
+        sizes[i] = (m, n)
+
+    jobs = [(i, algorithm, os.path.join(folder_path, f"g{i}.rud"), seed,
+             grasp_time_limit, stop_at_best_known, elite_size, grasp_workers)
+            for i in sorted(sizes, key=lambda i: sizes[i], reverse=True)
+            for algorithm in BATCH_ALGORITHMS]
+    if finished and not jobs:
+        print(f"All {len(finished)} rows are already in {output_csv_path}; nothing to compute. "
+              "Run without --resume to recompute them.")
+        return
+
+    # rewrite the header and the complete rows kept from a previous run,
+    # dropping anything half written; each new row is merged in as it completes
+    _write_finished_rows(output_csv_path, finished)
+    with open(trace_path, 'w', newline='') as tracefile:
+        trace_writer = csv.writer(tracefile)
+        trace_writer.writerow(TRACE_HEADER)
+        trace_writer.writerows(finished_trace)
+        tracefile.flush()
+
+        results = {i: {} for i in sizes}
+
+        for i, algorithm, value in _batch_results(jobs, workers):
+            results[i][algorithm] = value
+            if algorithm == 'grasp':
+                trace_writer.writerows([f"G{i}", "GRASP", f"{elapsed:.6f}", ii, best_val]
+                                       for elapsed, ii, best_val in value[2])
+                tracefile.flush()
+                value = value[0]
+            print(f"G{i} {algorithm} done: {value}")
+            if len(results[i]) == len(BATCH_ALGORITHMS):
+                m, n = sizes[i]
+                values = results.pop(i)
+                finished[i] = [
+                    f"G{i}", n, m,
+                    values['randomized'],
+                    values['greedy'],
+                    values['semi_greedy'],
+                    LOCAL_RUNS, values['local'],
+                    values['grasp'][1], values['grasp'][0],
+                    best_known[i-1],
+                    time_to_best_known(values['grasp'][2], i)
+                ]
+                _write_finished_rows(output_csv_path, finished)
+                print(f"row {i} written for g{i}.rud")
+
+
 if __name__ == "__main__":
-    folder_path = "./graphs"  
-    output_csv_path = "Observed_data.csv"
-    process_all_rud_files(folder_path, output_csv_path)
+    parser = argparse.ArgumentParser(description="Run the MAX-CUT heuristics on g1.rud .. g54.rud")
+    parser.add_argument("folder_path", nargs="?", default="./graphs")
+    parser.add_argument("output_csv_path", nargs="?", default="Observed_data.csv")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--resume", action="store_true",
+                        help="keep rows already in the CSV and compute only the missing ones")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--serial", action="store_true", help="use the original one-graph-at-a-time loop")
+    parser.add_argument("--grasp-time-limit", type=float, default=None,
+                        help=f"seconds per graph for GRASP instead of {GRASP_ITERATIONS} iterations")
+    parser.add_argument("--stop-at-best-known", action="store_true",
+                        help="stop GRASP once it reaches the known best value")
+    parser.add_argument("--elite-size", type=int, default=0,
+                        help="elite pool size for GRASP with path relinking (0: plain GRASP)")
+    parser.add_argument("--grasp-workers", type=int, default=1,
+                        help="processes each GRASP run is split over (default: 1)")
+    args = parser.parse_args()
+    if args.serial:
+        process_all_rud_files(args.folder_path, args.output_csv_path, args.grasp_workers)
+    else:
+        batch_process_rud_files(args.folder_path, args.output_csv_path,
+                                args.workers, args.resume, args.seed,
+                                args.grasp_time_limit, args.stop_at_best_known, args.elite_size,
+                                args.grasp_workers)